@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db.router import check_replica_settings
+        # Без тега database: такие проверки Django 2.2 запускает, только
+        # если их попросить явно, а не при check и runserver.
+        checks.register(check_replica_settings)
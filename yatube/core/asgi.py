@@ -0,0 +1,232 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+Django 2.2 не умеет ASGI и асинхронных представлений, поэтому адаптер
+делит работу так: приём сообщений клиента и отправку ответа медленному
+клиенту ведёт цикл событий, а поток из пула занят только на время
+самого представления (БД и шаблон). Так сотни медленных клиентов
+обслуживаются несколькими потоками, а не потоком на каждого.
+
+Тело запроса не собирается в память заранее: wsgi.input забирает куски
+http.request по мере чтения. После тела цикл ждёт http.disconnect, и
+если клиент ушёл, итерация потокового ответа прекращается.
+"""
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Сколько кусков ответа поток может обогнать отправку клиенту и сколько
+# кусков тела запроса цикл может принять раньше, чем их прочтут.
+QUEUE_SIZE = 16
+
+
+class ClientDisconnected(OSError):
+    """Клиент ушёл, не дослав тело запроса."""
+
+
+class RequestBody(io.RawIOBase):
+    """wsgi.input: куски тела приходят из цикла событий по мере чтения."""
+
+    def __init__(self, loop, chunks):
+        self.loop = loop
+        self.chunks = chunks
+        self.pending = b''
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.finished:
+            chunk = asyncio.run_coroutine_threadsafe(
+                self.chunks.get(), self.loop
+            ).result()
+            if isinstance(chunk, Exception):
+                self.finished = True
+                raise chunk
+            if chunk is None:
+                self.finished = True
+            else:
+                self.pending = chunk
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+class AsgiHandler:
+    def __init__(self, wsgi_application=None, workers=None):
+        self.wsgi_application = wsgi_application or WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or settings.ASGI_WORKERS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def receive_messages(self, receive, chunks, disconnected):
+        """Передаёт куски тела в chunks, а потом ждёт отключения клиента."""
+        reading = True
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                if reading:
+                    # Непрочитанные куски уже не нужны, а поток должен
+                    # узнать об отключении, даже если очередь полна.
+                    while not chunks.empty():
+                        chunks.get_nowait()
+                    chunks.put_nowait(ClientDisconnected())
+                return
+            if reading and message.get('body'):
+                await chunks.put(message['body'])
+            if reading and not message.get('more_body'):
+                reading = False
+                await chunks.put(None)
+
+    def environ(self, scope, body):
+        """WSGI-окружение из ASGI scope по PEP 3333."""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+    def run(self, environ, loop, queue, disconnected):
+        """Выполняет запрос в потоке пула и передаёт ответ в очередь.
+
+        Весь запрос, включая итерацию потокового ответа и close(), идёт в
+        одном потоке: соединения Django с БД привязаны к потоку. Очередь
+        ограничена, так что медленный клиент притормаживает генерацию
+        потокового ответа, а не копит его в памяти.
+        """
+        def put(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put((
+                int(status.split(' ', 1)[0]),
+                [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            ))
+
+        response = None
+        try:
+            response = self.wsgi_application(environ, start_response)
+            for chunk in response:
+                if disconnected.is_set():
+                    break
+                if chunk:
+                    put(chunk)
+        except Exception as error:
+            put(error)
+        finally:
+            try:
+                # close() шлёт request_finished, и Django закрывает
+                # соединения с БД этого потока.
+                if hasattr(response, 'close'):
+                    response.close()
+            finally:
+                put(None)
+
+    async def http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=QUEUE_SIZE)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        disconnected = threading.Event()
+        receiver = asyncio.ensure_future(
+            self.receive_messages(receive, chunks, disconnected)
+        )
+        body = io.BufferedReader(RequestBody(loop, chunks))
+        worker = loop.run_in_executor(
+            self.executor, self.run,
+            self.environ(scope, body), loop, queue, disconnected,
+        )
+        try:
+            message = await queue.get()
+            if disconnected.is_set():
+                return
+            if isinstance(message, Exception):
+                raise message
+            status, headers = message
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': headers,
+            })
+            while True:
+                message = await queue.get()
+                if message is None or disconnected.is_set():
+                    break
+                if isinstance(message, Exception):
+                    raise message
+                await send({
+                    'type': 'http.response.body',
+                    'body': message,
+                    'more_body': True,
+                })
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Клиент ушёл или ответ сломался: разбираем очередь, чтобы
+            # поток пула не завис на put() и вернулся в пул.
+            disconnected.set()
+            while not worker.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {getter, worker}, return_when=asyncio.FIRST_COMPLETED
+                )
+                getter.cancel()
+            receiver.cancel()
+
+
+def get_asgi_application():
+    """Как get_wsgi_application, но возвращает ASGI-приложение."""
+    django.setup(set_prefix=False)
+    return AsgiHandler()
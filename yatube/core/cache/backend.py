@@ -0,0 +1,169 @@
+"""Бэкенд кэша Django поверх core.cache.server.
+
+Соединения с сервером берутся из пула, get_many/set_many уходят одним
+кадром, а счётчики попаданий и промахов ведутся и в процессе, и на
+сервере (общие для всех воркеров).
+
+Если сервер недоступен, ошибка пишется в лог, чтение считается
+промахом, а запись пропускается: страницы работают, только без кэша.
+"""
+import logging
+import pickle
+import queue
+import socket
+import threading
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .protocol import recv_frame, send_frame
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE: int = 8
+# Сколько секунд ждать ответа сервера, прежде чем считать его недоступным.
+SOCKET_TIMEOUT: float = 1.0
+
+
+class SocketCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        self.path = server
+        options = params.get('OPTIONS', {})
+        self.pool = queue.LifoQueue(options.get('POOL_SIZE', POOL_SIZE))
+        self.socket_timeout = options.get('SOCKET_TIMEOUT', SOCKET_TIMEOUT)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.socket_timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _call(self, op, *args, default=None):
+        """Выполняет op на сервере; если он недоступен - вернёт default."""
+        try:
+            sock = self.pool.get_nowait()
+        except queue.Empty:
+            sock = None
+        try:
+            sock = sock or self._connect()
+            send_frame(sock, (op, args))
+            ok, result = recv_frame(sock)
+        except OSError as error:
+            if sock is not None:
+                sock.close()
+            logger.warning('Сервер кэша %s недоступен: %s', self.path, error)
+            return default
+        try:
+            self.pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+        if not ok:
+            raise result
+        return result
+
+    @staticmethod
+    def _dump(value):
+        # Целые храним как есть, чтобы сервер мог выполнять incr.
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, bytes):
+            return pickle.loads(value)
+        return value
+
+    def _count(self, hits, misses):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        made = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made[made_key] = key
+        found = self._call('get_many', list(made), default={})
+        self._count(len(found), len(made) - len(found))
+        return {made[key]: self._load(value) for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = {}
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items[key] = self._dump(value)
+        self._call('set_many', items, self.get_backend_timeout(timeout))
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._call(
+            'add', key, self._dump(value), self.get_backend_timeout(timeout),
+            default=False,
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._call(
+            'touch', key, self.get_backend_timeout(timeout), default=False
+        )
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        self._call('delete_many', keys)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self._call('incr', key, delta)
+        if value is None:
+            # Без сервера ключа нет, как и у других бэкендов.
+            raise ValueError(f'Ключ {key!r} не найден')
+        return value
+
+    def clear(self):
+        self._call('clear')
+
+    def stats(self):
+        """Попадания и промахи процесса и общие по серверу."""
+        return {
+            'process': {'hits': self.hits, 'misses': self.misses},
+            'server': self._call('stats', default={}),
+        }
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса, а пул соединений
+        # должен переживать запросы потока.
+        pass
+
+    def disconnect(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
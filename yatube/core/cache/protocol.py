@@ -0,0 +1,26 @@
+"""Кадры обмена с сервером кэша: 4 байта длины и pickle полезной нагрузки."""
+import pickle
+import struct
+
+HEADER = struct.Struct('!I')
+
+
+def send_frame(sock, payload):
+    data = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('Сервер кэша закрыл соединение')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    (size,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return pickle.loads(_recv_exactly(sock, size))
@@ -0,0 +1,167 @@
+"""Локальный сервер кэша на Unix-сокете, общий для всех воркеров.
+
+Значения хранятся уже сериализованными клиентом, поэтому сервер не
+импортирует классы приложения. Вытеснение — LRU по MAX_ENTRIES.
+
+Кадры протокола - pickle, и распаковка чужого кадра равна выполнению
+чужого кода. Поэтому сокет создаётся с правами 0600, а соединения от
+процессов другого пользователя (SO_PEERCRED, где он есть) закрываются
+до чтения первого кадра.
+"""
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from .protocol import recv_frame, send_frame
+
+MAX_ENTRIES: int = 100000
+SOCKET_MODE = 0o600
+PEERCRED = struct.Struct('3i')
+OPERATIONS = frozenset((
+    'get_many', 'set_many', 'add', 'touch', 'delete_many', 'incr',
+    'clear', 'stats',
+))
+
+
+class Store:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _alive(self, key, now):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires is not None and expires <= now:
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return item
+
+    def _put(self, key, value, expires):
+        self.data[key] = (expires, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_entries:
+            self.data.popitem(last=False)
+
+    def get_many(self, keys):
+        now = time.time()
+        with self.lock:
+            found = {}
+            for key in keys:
+                item = self._alive(key, now)
+                if item is not None:
+                    found[key] = item[1]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items, expires):
+        with self.lock:
+            for key, value in items.items():
+                self._put(key, value, expires)
+
+    def add(self, key, value, expires):
+        with self.lock:
+            if self._alive(key, time.time()) is not None:
+                return False
+            self._put(key, value, expires)
+            return True
+
+    def touch(self, key, expires):
+        with self.lock:
+            item = self._alive(key, time.time())
+            if item is None:
+                return False
+            self._put(key, item[1], expires)
+            return True
+
+    def delete_many(self, keys):
+        with self.lock:
+            return sum(
+                self.data.pop(key, None) is not None for key in keys
+            )
+
+    def incr(self, key, delta):
+        with self.lock:
+            item = self._alive(key, time.time())
+            if item is None:
+                raise ValueError(f'Ключ {key!r} не найден')
+            expires, value = item
+            value = value + delta
+            self._put(key, value, expires)
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.data),
+            }
+
+
+def _peer_uid(sock):
+    """uid процесса на другом конце сокета или None, если ОС не сообщает."""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    _, uid, _ = PEERCRED.unpack(sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size
+    ))
+    return uid
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        if _peer_uid(self.request) not in (None, os.getuid()):
+            return
+        store = self.server.store
+        while True:
+            try:
+                op, args = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            if op not in OPERATIONS:
+                send_frame(self.request, (False, ValueError(op)))
+                continue
+            try:
+                result = (True, getattr(store, op)(*args))
+            except Exception as error:
+                result = (False, error)
+            send_frame(self.request, result)
+
+
+class CacheServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.store = Store(max_entries)
+        super().__init__(path, Handler)
+
+    def server_bind(self):
+        # Сокет сразу создаётся недоступным другим пользователям.
+        umask = os.umask(0o777 & ~SOCKET_MODE)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, SOCKET_MODE)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
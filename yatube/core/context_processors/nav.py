@@ -0,0 +1,31 @@
+from functools import lru_cache
+
+from django.templatetags.static import static
+from django.urls import reverse
+
+# Ключ в шаблоне -> имя адреса для ссылок шапки и переключателя лент.
+NAV_URLS = {
+    'index': 'posts:index',
+    'follow_index': 'posts:follow_index',
+    'search': 'posts:search',
+    'post_create': 'posts:post_create',
+    'about_author': 'about:author',
+    'about_tech': 'about:tech',
+    'password_change': 'users:password_change',
+    'logout': 'users:logout',
+    'login': 'users:login',
+    'signup': 'users:signup',
+}
+
+
+@lru_cache(maxsize=None)
+def _nav():
+    # Адреса без аргументов не меняются, пока работает процесс:
+    # считаем их один раз, а не десятком {% url %} на каждой странице.
+    urls = {name: reverse(view) for name, view in NAV_URLS.items()}
+    urls['logo'] = static('img/logo.png')
+    return urls
+
+
+def nav(request):
+    return {'nav': _nav()}
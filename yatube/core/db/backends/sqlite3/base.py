@@ -0,0 +1,86 @@
+"""SQLite для нагруженного сайта: WAL, PRAGMA и повтор занятой базы.
+
+Подключается как ENGINE 'core.db.backends.sqlite3'. Дополнительные ключи
+OPTIONS (остальные, например timeout, уходят в sqlite3.connect):
+
+PRAGMAS - словарь PRAGMA, выполняемых на каждом новом соединении;
+TRANSACTION_MODE - как открывать транзакции atomic(): IMMEDIATE сразу
+    берёт блокировку записи, и пишущая транзакция не падает посередине
+    с "database is locked" при повышении блокировки;
+BUSY_RETRIES, BUSY_BACKOFF - сколько раз и с какой начальной паузой
+    повторять запрос вне транзакции, если база занята дольше timeout.
+"""
+import logging
+import time
+
+from django.db.backends.sqlite3 import base
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_OPTIONS = (
+    'PRAGMAS', 'TRANSACTION_MODE', 'BUSY_RETRIES', 'BUSY_BACKOFF',
+)
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class BusyRetryCursorWrapper(base.SQLiteCursorWrapper):
+    """Повторяет запрос с растущей паузой, пока база занята.
+
+    Повтор безопасен только вне транзакции: упавший запрос в режиме
+    autocommit ничего не изменил. В транзакции ошибка уходит наружу.
+    """
+    retries = 0
+    backoff = 0.05
+
+    def _retry(self, method, *args):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                if (
+                    attempt == self.retries
+                    or self.connection.in_transaction
+                    or not is_busy(error)
+                ):
+                    raise
+                logger.warning('База занята, повтор через %.2f с', delay)
+                time.sleep(delay)
+                delay *= 2
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        param_list = list(param_list)
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in CUSTOM_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('PRAGMAS', {})
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        options = self.settings_dict['OPTIONS']
+        cursor = self.connection.cursor(factory=BusyRetryCursorWrapper)
+        cursor.retries = options.get('BUSY_RETRIES', 0)
+        cursor.backoff = options.get('BUSY_BACKOFF', 0.05)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('TRANSACTION_MODE')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,121 @@
+"""Чтение лент с реплик, запись и «свои записи» - с основной базы.
+
+Представления, помеченные @replica_reads, читают со случайной реплики из
+REPLICA_DATABASES; всё остальное и любые записи идут в default. После
+записи ReplicaPinMiddleware ставит короткую cookie, и пока она жива,
+читатель видит основную базу - так автор сразу видит свой пост, даже
+если реплика отстаёт.
+
+Каждая синхронизация реплики начинает поколение кэша replica:<alias>;
+кэш страниц и ETag, построенные по реплике, учитывают его, поэтому
+снимок устаревшей реплики не переживает её обновление.
+
+Сессии и пользователи всегда читаются с основной базы: на реплике
+только что вошедший пользователь оказался бы анонимом. Закрепление
+после записи должно быть дольше интервала синхронизации реплик, это
+проверяет check_replica_settings.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+# Приложения, которые читаются только с основной базы.
+PRIMARY_APPS = frozenset(('auth', 'sessions'))
+
+_state = threading.local()
+
+
+def current_replica():
+    """Реплика, с которой читает текущий запрос, или None."""
+    return getattr(_state, 'replica', None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+def check_replica_settings(app_configs, **kwargs):
+    """Закрепление за основной базой не короче интервала синхронизации."""
+    if settings.REPLICA_DATABASES and (
+        settings.REPLICA_PIN_SECONDS <= settings.REPLICA_SYNC_INTERVAL
+    ):
+        return [checks.Error(
+            'REPLICA_PIN_SECONDS должно быть больше REPLICA_SYNC_INTERVAL: '
+            'иначе автор может не увидеть свою запись на реплике.',
+            id='core.E001',
+        )]
+    return []
+
+
+def replica_reads(view):
+    """Отдаёт чтения представления реплике, если читатель не закреплён."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or getattr(_state, 'pinned', False):
+            return view(request, *args, **kwargs)
+        _state.replica = random.choice(replicas)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет за основной базой того, кто только что писал."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote, _state.pinned = _state.wrote, False
+        if wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+
+
+def sync_replica(alias):
+    """Копирует основную базу SQLite в файл реплики через backup API."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
+    # То же, что posts.utils.bump_generation('replica:<alias>').
+    cache.set(f'generation:replica:{alias}', time.time_ns(), None)
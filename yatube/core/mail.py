@@ -0,0 +1,45 @@
+"""Отправка писем через очередь задач.
+
+QueuedEmailBackend только ставит письмо в очередь, поэтому запрос
+(например, сброс пароля) не ждёт SMTP или диска. Воркер отправляет
+накопившиеся письма пачкой через одно соединение TASKS_EMAIL_BACKEND.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+MESSAGE_FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+    'extra_headers', 'alternatives',
+)
+
+
+def dump_message(message):
+    if message.attachments:
+        raise ValueError('Письма с вложениями через очередь не отправляются')
+    return {field: getattr(message, field, None) for field in MESSAGE_FIELDS}
+
+
+def load_message(data):
+    alternatives = data.pop('alternatives') or []
+    data['headers'] = data.pop('extra_headers')
+    message = EmailMultiAlternatives(**data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+@task(priority=6, batch=True)
+def send_queued_messages(batch):
+    """Отправляет письма пачки через одно соединение."""
+    connection = get_connection(settings.TASKS_EMAIL_BACKEND)
+    connection.send_messages([load_message(data) for data, in batch])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send_queued_messages.delay(dump_message(message))
+        return len(email_messages)
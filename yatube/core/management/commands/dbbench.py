@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+# Настройки SQLite, которые сравниваются: стандартный движок Django и
+# настроенный, как в DATABASES['default'].
+PROFILES = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'tuned': {
+        'ENGINE': settings.DATABASES['default']['ENGINE'],
+        'OPTIONS': settings.DATABASES['default'].get('OPTIONS', {}),
+    },
+}
+
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date TEXT)',
+    'CREATE INDEX bench_post_author_idx ON bench_post '
+    '(author_id, pub_date DESC)',
+)
+INSERT = (
+    'INSERT INTO bench_post (author_id, text, pub_date) '
+    "VALUES (%s, %s, strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now'))"
+)
+SELECT = (
+    'SELECT id, text, pub_date FROM bench_post WHERE author_id = %s '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+AUTHORS = 50
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite со стандартными и '
+        'настроенными параметрами: параллельные записи и чтения ленты.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести результат в JSON'
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, profile in PROFILES.items():
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                results[name] = self.run_profile(
+                    name, profile, os.path.join(tmp_dir, 'bench.sqlite3'),
+                    options,
+                )
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:>6}: {result["writes_per_second"]:8.0f} записей/с, '
+                f'{result["reads_per_second"]:8.0f} чтений/с, '
+                f'ошибок "database is locked": {result["errors"]}'
+            )
+
+    def run_profile(self, name, profile, path, options):
+        alias = f'dbbench_{name}'
+        connections.databases[alias] = {**profile, 'NAME': path}
+        with connections[alias].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            cursor.executemany(INSERT, [
+                (i % AUTHORS, 'Текст поста ' * 20)
+                for i in range(options['rows'])
+            ])
+        connections[alias].close()
+
+        counts = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def worker(write):
+            done = errors = 0
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        if write:
+                            with transaction.atomic(using=alias):
+                                with connections[alias].cursor() as cursor:
+                                    cursor.execute(
+                                        INSERT, (done % AUTHORS, 'Новый пост')
+                                    )
+                        else:
+                            with connections[alias].cursor() as cursor:
+                                cursor.execute(SELECT, (done % AUTHORS,))
+                                cursor.fetchall()
+                        done += 1
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connections[alias].close()
+            with lock:
+                counts['writes' if write else 'reads'] += done
+                counts['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(True,))
+            for _ in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=(False,))
+            for _ in range(options['readers'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        del connections.databases[alias]
+        return {
+            'writes_per_second': counts['writes'] / elapsed,
+            'reads_per_second': counts['reads'] / elapsed,
+            'errors': counts['errors'],
+        }
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.cache.server import MAX_ENTRIES, CacheServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает общий сервер кэша на Unix-сокете.'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=settings.CACHE_SOCKET or os.path.join(
+                settings.BASE_DIR, 'cache.sock'
+            ),
+            help='Путь к Unix-сокету сервера.',
+        )
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=MAX_ENTRIES,
+            help='Сколько ключей хранить до вытеснения LRU.',
+        )
+
+    def handle(self, *args, **options):
+        server = CacheServer(options['socket'], options['max_entries'])
+        self.stdout.write(f'Сервер кэша слушает {options["socket"]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core_task'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Сколько задач забирать за раз (TASKS_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза, когда очередь пуста, в секундах',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти',
+        )
+
+    def handle(self, *args, **options):
+        done = 0
+        while True:
+            close_old_connections()
+            count = run_pending(options['batch_size'])
+            done += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(f'Выполнено задач: {done}')
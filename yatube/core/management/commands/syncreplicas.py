@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db.router import sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик REPLICA_DATABASES'
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд (по умолчанию один раз); '
+                 'не больше REPLICA_SYNC_INTERVAL',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('Реплики не настроены: задайте DB_REPLICA')
+        if options['interval'] > settings.REPLICA_SYNC_INTERVAL:
+            raise CommandError(
+                f'Интервал больше REPLICA_SYNC_INTERVAL='
+                f'{settings.REPLICA_SYNC_INTERVAL}: закрепление за основной '
+                f'базой ({settings.REPLICA_PIN_SECONDS} с) кончится раньше, '
+                f'чем реплика догонит запись'
+            )
+        while True:
+            for alias in settings.REPLICA_DATABASES:
+                sync_replica(alias)
+                self.stdout.write(f'Реплика {alias} обновлена')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
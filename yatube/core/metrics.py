@@ -0,0 +1,185 @@
+"""Метрики представлений: запросы к БД, время БД, шаблонов и ответа.
+
+MetricsMiddleware замеряет каждый запрос и складывает значения в
+гистограммы по имени представления (posts:index, api:profile, ...).
+Гистограммы живут в памяти процесса и отдаются в формате Prometheus
+по адресу /metrics/; каждый запрос также пишется строкой в лог
+core.metrics. Для представлений из METRICS_BUDGETS превышение бюджета
+пишется предупреждением, а с METRICS_BUDGETS_STRICT - поднимает
+BudgetExceeded, так что тесты падают на лишних запросах.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин; последняя корзина (+Inf) - все наблюдения.
+MS_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Метрика -> (корзины, описание для /metrics/).
+METRICS = {
+    'queries': (QUERY_BUCKETS, 'Запросов к БД за ответ'),
+    'db_ms': (MS_BUCKETS, 'Время запросов к БД, мс'),
+    'render_ms': (MS_BUCKETS, 'Время рендеринга шаблонов, мс'),
+    'total_ms': (MS_BUCKETS, 'Полное время ответа, мс'),
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_local = threading.local()
+
+
+class BudgetExceeded(AssertionError):
+    """Представление вышло за бюджет из METRICS_BUDGETS."""
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Пары (граница, наблюдений не больше неё), как в Prometheus."""
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+def observe(view, sample):
+    with _lock:
+        for name, value in sample.items():
+            histogram = _histograms.get((view, name))
+            if histogram is None:
+                histogram = _histograms[view, name] = Histogram(
+                    METRICS[name][0]
+                )
+            histogram.observe(value)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """Копия гистограмм: {(представление, метрика): Histogram}."""
+    with _lock:
+        copies = {}
+        for key, histogram in _histograms.items():
+            copy = copies[key] = Histogram(histogram.buckets)
+            copy.counts = list(histogram.counts)
+            copy.sum, copy.count = histogram.sum, histogram.count
+        return copies
+
+
+def render_prometheus():
+    """Гистограммы в текстовом формате Prometheus 0.0.4."""
+    histograms = snapshot()
+    lines = []
+    for name, (_, help_text) in METRICS.items():
+        metric = f'yatube_view_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (view, key), histogram in sorted(histograms.items()):
+            if key != name:
+                continue
+            for bound, count in histogram.cumulative():
+                lines.append(
+                    f'{metric}_bucket{{view="{view}",le="{bound}"}} {count}'
+                )
+            lines.append(f'{metric}_sum{{view="{view}"}} {histogram.sum:g}')
+            lines.append(f'{metric}_count{{view="{view}"}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        sample = getattr(_local, 'sample', None)
+        if sample is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            sample['render_ms'] += (time.perf_counter() - started) * 1000
+    wrapper.metrics_timed = True
+    return wrapper
+
+
+if not getattr(Template.render, 'metrics_timed', False):
+    # Бэкенд шаблонов Django не сообщает о рендеринге вне тестов, а
+    # render() и render_to_string() всегда проходят через этот метод.
+    Template.render = _timed_render(Template.render)
+
+
+def check_budget(view, sample):
+    budget = settings.METRICS_BUDGETS.get(view)
+    if not budget:
+        return
+    exceeded = [
+        f'{name} {sample[name]:g} > {limit}'
+        for name, limit in budget.items() if sample[name] > limit
+    ]
+    if not exceeded:
+        return
+    message = f'{view} вышло за бюджет: {", ".join(exceeded)}'
+    if settings.METRICS_BUDGETS_STRICT:
+        raise BudgetExceeded(message)
+    logger.warning(message)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def count_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            _local.sample['queries'] += 1
+            _local.sample['db_ms'] += (time.perf_counter() - started) * 1000
+
+    def __call__(self, request):
+        sample = _local.sample = dict.fromkeys(METRICS, 0)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.count_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.sample = None
+        sample['total_ms'] = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        observe(view, sample)
+        logger.info(
+            '%s %s: %d запросов, БД %.1f мс, шаблоны %.1f мс, всего %.1f мс',
+            request.method, view, sample['queries'], sample['db_ms'],
+            sample['render_ms'], sample['total_ms'],
+        )
+        check_budget(view, sample)
+        return response
@@ -0,0 +1,156 @@
+"""Очередь фоновых задач в таблице core_task.
+
+Функция становится задачей декоратором @task, а f.delay(*args) пишет
+строку Task в той же транзакции, что и основная запись, так что задача
+не потеряется и не выполнится для откатившейся записи. Воркер
+(manage.py runworker) забирает пачки задач по приоритету, выполняет
+каждую в своей транзакции и при ошибке повторяет с растущей паузой.
+
+С TASKS_EAGER задачи выполняются сразу при постановке - так работают
+разработка и тесты без воркера.
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(priority=0, max_attempts=3, batch=False):
+    """Делает функцию задачей; аргументы должны сериализоваться в JSON.
+
+    Функция с batch=True получает список аргументов всех задач пачки
+    и обрабатывает их разом.
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.task_options = {
+            'priority': priority,
+            'max_attempts': max_attempts,
+            'batch': batch,
+        }
+        func.delay = lambda *args, **options: enqueue(func, *args, **options)
+        return func
+    return decorator
+
+
+def enqueue(func, *args, priority=None, delay=0):
+    """Ставит вызов func(*args) в очередь."""
+    options = func.task_options
+    payload = json.dumps(args)
+    if settings.TASKS_EAGER:
+        call(func, [json.loads(payload)])
+        return None
+    return Task.objects.create(
+        name=func.task_name,
+        args=payload,
+        priority=options['priority'] if priority is None else priority,
+        max_attempts=options['max_attempts'],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def call(func, batch):
+    """Выполняет задачи одной функции: пачкой или по одной."""
+    if func.task_options['batch']:
+        func(batch)
+    else:
+        for args in batch:
+            func(*args)
+
+
+def resolve(name):
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ImportError(f'{name} не является задачей')
+    return func
+
+
+def claim(limit, worker_id=None):
+    """Забирает до limit готовых задач, самые важные первыми.
+
+    Задачи помечаются меткой воркера одним UPDATE, поэтому два воркера
+    не получат одну задачу и без SELECT ... FOR UPDATE. Задачи,
+    зависшие у упавшего воркера дольше TASKS_LOCK_TIMEOUT, возвращаются
+    в очередь.
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        Task.objects.filter(
+            status=Task.RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT),
+        ).update(status=Task.QUEUED, locked_by='')
+        ids = list(Task.objects.filter(
+            status=Task.QUEUED, run_at__lte=now
+        ).order_by('-priority', 'run_at', 'pk').values_list(
+            'pk', flat=True
+        )[:limit])
+        Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now
+        )
+    return list(Task.objects.filter(
+        pk__in=ids, status=Task.RUNNING, locked_by=worker_id
+    ).order_by('-priority', 'run_at', 'pk'))
+
+
+def fail(tasks, error):
+    """Откладывает задачи на повтор или помечает их невыполненными."""
+    for item in tasks:
+        item.attempts += 1
+        item.last_error = error
+        item.locked_by = ''
+        if item.attempts >= item.max_attempts:
+            item.status = Task.FAILED
+        else:
+            item.status = Task.QUEUED
+            item.run_at = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (item.attempts - 1)
+            )
+        item.save(update_fields=[
+            'attempts', 'last_error', 'locked_by', 'status', 'run_at'
+        ])
+
+
+def run_group(tasks):
+    """Выполняет задачи одной функции; пачечные - одним вызовом."""
+    name = tasks[0].name
+    try:
+        func = resolve(name)
+    except ImportError:
+        fail(tasks, traceback.format_exc())
+        return
+    chunks = [tasks] if func.task_options['batch'] else [[t] for t in tasks]
+    for chunk in chunks:
+        try:
+            # Результат задачи и удаление её строки фиксируются вместе.
+            with transaction.atomic():
+                call(func, [json.loads(item.args) for item in chunk])
+                Task.objects.filter(
+                    pk__in=[item.pk for item in chunk]
+                ).delete()
+        except Exception:
+            logger.exception('Задача %s не выполнена', name)
+            fail(chunk, traceback.format_exc())
+
+
+def run_pending(limit=None):
+    """Забирает и выполняет одну пачку задач; возвращает её размер.
+
+    Порядок очереди сохраняется: в один вызов пачечной функции попадают
+    только идущие подряд задачи с одним именем.
+    """
+    tasks = claim(limit or settings.TASKS_BATCH_SIZE)
+    for _, group in groupby(tasks, key=lambda item: item.name):
+        run_group(list(group))
+    return len(tasks)
@@ -0,0 +1,121 @@
+from django import template
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+register = template.Library()
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы get_thumbnail."""
+        source = ImageFile(file_)
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но без генерации: None, если миниатюры нет."""
+        return resolve_thumbnails(
+            [file_], geometry_string, **options
+        ).get(file_.name)
+
+
+backend = CachedThumbnailBackend()
+
+
+def _read_raw(raw_keys):
+    """Читает ключи KV-хранилища sorl одним get_many и одним SELECT."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in raw_keys}
+    values = kvstore.cache.get_many(raw_keys)
+    missing = [key for key in raw_keys if key not in values]
+    if missing:
+        rows = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kvstore.cache.set_many(rows, settings.THUMBNAIL_CACHE_TIMEOUT)
+        # Как и sorl, запоминаем отсутствие ключа, чтобы не ходить в БД,
+        # но ненадолго: миниатюру создаёт воркер, и в кэш другого процесса
+        # она сама не попадёт.
+        kvstore.cache.set_many(
+            {key: EMPTY_VALUE for key in missing if key not in rows},
+            settings.THUMBNAIL_MISS_TIMEOUT,
+        )
+        values.update(rows)
+    return values
+
+
+def resolve_thumbnails(files, geometry_string, **options):
+    """Готовые миниатюры нескольких картинок: {имя картинки: файл|None}."""
+    raw_keys = {}
+    for file_ in files:
+        if file_:
+            thumbnail = backend.thumbnail_file(
+                file_, geometry_string, **options
+            )
+            raw_keys[add_prefix(thumbnail.key)] = file_.name
+    values = _read_raw(list(raw_keys))
+    resolved = {}
+    for raw_key, name in raw_keys.items():
+        value = values.get(raw_key)
+        resolved[name] = (
+            deserialize_image_file(value)
+            if value and value != EMPTY_VALUE else None
+        )
+    return resolved
+
+
+def _prefetch_key(geometry_string, options):
+    return ('lazy_thumbnail', geometry_string, tuple(sorted(options.items())))
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_thumbnails(context, posts, geometry_string, **options):
+    """Разом находит миниатюры картинок всех постов страницы.
+
+    Следующие cached_thumbnail с той же геометрией берут результат отсюда.
+    """
+    context.render_context[_prefetch_key(geometry_string, options)] = (
+        resolve_thumbnails(
+            [post.image for post in posts], geometry_string, **options
+        )
+    )
+    return ''
+
+
+def _prefetched(context, key):
+    """Миниатюры prefetch_thumbnails, в том числе из шаблона, который
+    подключил текущий через {% include %}."""
+    for scope in reversed(context.render_context.dicts):
+        if key in scope:
+            return scope[key]
+    return {}
+
+
+@register.simple_tag(takes_context=True)
+def cached_thumbnail(context, file_, geometry_string, **options):
+    """Готовая миниатюра или, пока её нет, сама картинка."""
+    if not file_:
+        return None
+    prefetched = _prefetched(context, _prefetch_key(geometry_string, options))
+    if file_.name in prefetched:
+        thumbnail = prefetched[file_.name]
+    else:
+        thumbnail = backend.get_cached_thumbnail(
+            file_, geometry_string, **options
+        )
+    return thumbnail or file_
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from core.asgi import QUEUE_SIZE, AsgiHandler
+
+
+class AsgiHandlerTest(SimpleTestCase):
+    def call(self, application, path='/', method='GET', body_parts=(b'',),
+             disconnect_after=None):
+        """Прогоняет один HTTP-запрос через ASGI и возвращает сообщения.
+
+        С disconnect_after клиент уходит, получив столько сообщений.
+        """
+        requests = [
+            {'type': 'http.request', 'body': part, 'more_body': True}
+            for part in body_parts
+        ]
+        requests[-1]['more_body'] = False
+        sent = []
+        self.received = 0
+        gone = asyncio.Event()
+
+        async def receive():
+            if requests:
+                self.received += 1
+                return requests.pop(0)
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == disconnect_after:
+                gone.set()
+
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_django_page(self):
+        """Страница Django отдаётся через ASGI."""
+        sent = self.call(AsgiHandler(workers=1), '/about/author/')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), sent[0]['headers']
+        )
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Об авторе'.encode(), body)
+
+    def test_request_body_and_streaming_response(self):
+        """Тело запроса собирается из частей, ответ уходит по кускам."""
+        closed = []
+
+        class Chunks(list):
+            def close(self):
+                closed.append(threading.current_thread().name)
+
+        def echo(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Chunks([environ['wsgi.input'].read(), b'-', b'end'])
+
+        sent = self.call(
+            AsgiHandler(echo, workers=1), method='POST',
+            body_parts=(b'ab', b'cd'),
+        )
+        self.assertEqual(
+            [message.get('body') for message in sent[1:]],
+            [b'abcd', b'-', b'end', b''],
+        )
+        self.assertTrue(closed[0].startswith('asgi'))
+
+    def test_request_body_is_read_on_demand(self):
+        """Куски тела забираются у клиента по мере чтения, а не заранее."""
+        seen = []
+
+        def reader(environ, start_response):
+            seen.append(environ['wsgi.input'].read(1))
+            seen.append(self.received)
+            seen.append(len(environ['wsgi.input'].read()))
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        parts = [b'x' * 10] * (QUEUE_SIZE * 4)
+        sent = self.call(
+            AsgiHandler(reader, workers=1), method='POST', body_parts=parts
+        )
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(seen[0], b'x')
+        self.assertLess(seen[1], len(parts))
+        self.assertEqual(seen[2], 10 * len(parts) - 1)
+
+    def test_streaming_stops_when_client_disconnects(self):
+        """Ушедшему клиенту потоковый ответ больше не генерируется."""
+        produced = []
+
+        def endless(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            while True:
+                produced.append(1)
+                yield b'chunk'
+
+        sent = self.call(AsgiHandler(endless, workers=1), disconnect_after=3)
+        self.assertLessEqual(len(sent), 3)
+        self.assertLess(len(produced), 3 + 2 * QUEUE_SIZE + 2)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+from django.test import TestCase
+
+from core.cache.backend import SocketCache
+from core.cache.server import CacheServer
+
+
+class SocketCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp_dir, 'cache.sock')
+        cls.server = CacheServer(cls.path, max_entries=3)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = SocketCache(self.path, {})
+        self.cache.clear()
+
+    def test_workers_share_values(self):
+        """Значение, записанное одним воркером, видно другому."""
+        other = SocketCache(self.path, {})
+        self.cache.set_many({'a': 1, 'b': {'text': 'пост'}})
+        self.assertEqual(
+            other.get_many(['a', 'b', 'c']), {'a': 1, 'b': {'text': 'пост'}}
+        )
+        self.assertEqual(other.incr('a'), 2)
+        self.assertEqual(self.cache.get('a'), 2)
+
+    def test_expiry_eviction_and_metrics(self):
+        """Просроченные и вытесненные ключи считаются промахами."""
+        self.cache.set('old', 1, timeout=0)
+        for key in ('x', 'y', 'z', 'w'):
+            self.cache.set(key, key)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertIsNone(self.cache.get('x'))
+        self.assertEqual(self.cache.get('w'), 'w')
+        stats = self.cache.stats()
+        self.assertEqual(stats['process'], {'hits': 1, 'misses': 2})
+        self.assertEqual(stats['server']['entries'], 3)
+
+    def test_pool_reuses_connections(self):
+        """Соединение возвращается в пул и используется повторно."""
+        self.cache.get('a')
+        sock = self.cache.pool.queue[-1]
+        self.cache.get('a')
+        self.assertIs(self.cache.pool.queue[-1], sock)
+        self.assertEqual(self.cache.pool.qsize(), 1)
+        self.cache.disconnect()
+
+    def test_socket_is_private(self):
+        """Подключиться к серверу может только его пользователь."""
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_unavailable_server_is_a_miss(self):
+        """Без сервера чтение - промах, запись пропускается, а не 500."""
+        missing = SocketCache(os.path.join(self.tmp_dir, 'missing.sock'), {})
+        with self.assertLogs('core.cache.backend', 'WARNING'):
+            self.assertIsNone(missing.get('a'))
+            missing.set('a', 1)
+            self.assertEqual(missing.get_many(['a', 'b']), {})
+            self.assertFalse(missing.add('a', 1))
+            missing.delete('a')
+            with self.assertRaises(ValueError):
+                missing.incr('a')
+            self.assertEqual(missing.get('a', 'default'), 'default')
@@ -0,0 +1,146 @@
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connections
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db.router import PIN_COOKIE, check_replica_settings, sync_replica
+from posts.models import Post
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'db.sqlite3')
+        self.connections = ConnectionHandler({
+            name: {
+                'ENGINE': 'core.db.backends.sqlite3',
+                'NAME': self.path,
+                'OPTIONS': {
+                    'timeout': 0.01,
+                    'TRANSACTION_MODE': 'IMMEDIATE',
+                    'BUSY_RETRIES': 3,
+                    'BUSY_BACKOFF': 0.05,
+                    'PRAGMAS': {
+                        'journal_mode': 'WAL', 'synchronous': 'NORMAL'
+                    },
+                },
+            } for name in ('default', 'second')
+        })
+
+    def tearDown(self):
+        for name in ('default', 'second'):
+            self.connections[name].close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_pragmas_are_applied(self):
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def lock_database(self):
+        """Открывает пишущую транзакцию в отдельном соединении."""
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        blocker = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        blocker.execute('BEGIN IMMEDIATE')
+        blocker.execute('INSERT INTO item VALUES (1)')
+        self.addCleanup(blocker.close)
+        return blocker
+
+    def test_busy_database_is_retried(self):
+        """Запрос вне транзакции ждёт, пока другой писатель закончит."""
+        blocker = self.lock_database()
+        timer = threading.Timer(0.1, blocker.commit)
+        timer.start()
+        with self.connections['second'].cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (2)')
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 2)
+        timer.join()
+
+    def test_busy_database_error_after_retries(self):
+        """Если база занята дольше всех повторов, ошибка уходит наружу."""
+        blocker = self.lock_database()
+        with self.assertRaises(OperationalError):
+            self.connections['second'].cursor().execute(
+                'INSERT INTO item VALUES (2)'
+            )
+        blocker.rollback()
+
+
+@override_settings(REPLICA_DATABASES=['replica_test'])
+class ReplicaRouterTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp_dir = tempfile.mkdtemp()
+        connections.databases['replica_test'] = {
+            'ENGINE': 'core.db.backends.sqlite3',
+            'NAME': os.path.join(self.tmp_dir, 'replica.sqlite3'),
+        }
+        self.user = get_user_model().objects.create_user(username='writer')
+        Post.objects.create(author=self.user, text='Пост в снимке')
+        sync_replica('replica_test')
+        # Этот пост появился после синхронизации: реплика его не видит.
+        Post.objects.create(author=self.user, text='Пост после снимка')
+
+    def tearDown(self):
+        connections['replica_test'].close()
+        del connections['replica_test']
+        del connections.databases['replica_test']
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_feeds_are_read_from_replica(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост в снимке')
+        self.assertNotContains(response, 'Пост после снимка')
+
+        sync_replica('replica_test')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост после снимка')
+
+    def test_writer_is_pinned_to_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertContains(response, 'Свежий пост')
+        self.assertContains(response, 'Пост после снимка')
+
+    def test_sessions_are_read_from_primary(self):
+        """Вошедший после синхронизации не становится анонимом."""
+        reader = get_user_model().objects.create_user(username='reader')
+        self.client.force_login(reader)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['user'], reader)
+
+    def test_pin_must_outlast_sync_interval(self):
+        self.assertEqual(check_replica_settings(None), [])
+        with override_settings(REPLICA_PIN_SECONDS=5):
+            errors = check_replica_settings(None)
+            registered = checks.run_checks()
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertIn('core.E001', [error.id for error in registered])
+        with self.assertRaises(CommandError):
+            call_command(
+                'syncreplicas', '--interval', '60', stdout=io.StringIO()
+            )
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+
+
+@override_settings(METRICS_BUDGETS_STRICT=True)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = get_user_model().objects.create_user(username='reader')
+        cls.author = get_user_model().objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            ) for i in range(15)
+        ]
+        cls.post = posts[-1]
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client.force_login(self.reader)
+
+    def test_pages_fit_budgets(self):
+        """Ленты, пост и API укладываются в бюджеты METRICS_BUDGETS."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list', args=['group']),
+            'posts:profile': reverse('posts:profile', args=['author']),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[self.post.pk]
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'api:index': reverse('api:index'),
+            'api:group_posts': reverse('api:group_posts', args=['group']),
+            'api:profile': reverse('api:profile', args=['author']),
+            'api:post_detail': reverse('api:post_detail', args=[self.post.pk]),
+            'api:post_comments': reverse(
+                'api:post_comments', args=[self.post.pk]
+            ),
+        }
+        for view, url in urls.items():
+            with self.subTest(view=view):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        histograms = metrics.snapshot()
+        for view in urls:
+            self.assertEqual(histograms[view, 'queries'].count, 1)
+            self.assertGreater(histograms[view, 'total_ms'].sum, 0)
+        self.assertGreater(histograms['posts:index', 'render_ms'].sum, 0)
+        self.assertEqual(histograms['api:index', 'render_ms'].sum, 0)
+
+    def test_follow_index_fits_budget(self):
+        """Лента подписок укладывается в бюджет и с автором, который
+        читается напрямую, и за границей подрезанной ленты."""
+        url = reverse('posts:follow_index')
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with override_settings(TIMELINE_SIZE=5):
+            timeline.rebuild([self.reader.pk])
+            page = self.client.get(url).context['page_obj']
+            response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_budget_exceeded(self):
+        budgets = {'posts:index': {'queries': 1}}
+        with override_settings(METRICS_BUDGETS=budgets):
+            with self.assertRaises(metrics.BudgetExceeded):
+                self.client.get(reverse('posts:index'))
+            with override_settings(METRICS_BUDGETS_STRICT=False):
+                with self.assertLogs('core.metrics', 'WARNING'):
+                    self.client.get(reverse('posts:index'))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.client.force_login(get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        ))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(
+            response, 'yatube_view_queries_count{view="posts:index"} 1'
+        )
+        self.assertContains(
+            response,
+            'yatube_view_total_ms_bucket{view="posts:index",le="+Inf"} 1',
+        )
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        with override_settings(METRICS_TOKEN='secret'):
+            for header, status in (
+                ('Bearer secret', 200), ('Bearer wrong', 404), ('', 404)
+            ):
+                with self.subTest(header=header):
+                    response = self.client.get(
+                        reverse('metrics'), HTTP_AUTHORIZATION=header
+                    )
+                    self.assertEqual(response.status_code, status)
@@ -0,0 +1,66 @@
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from core.mail import QueuedEmailBackend
+from core.models import Task
+from core.tasks import run_pending, task
+
+calls = []
+
+
+@task(priority=1)
+def record(value):
+    calls.append(value)
+
+
+@task(priority=5, batch=True)
+def record_batch(batch):
+    calls.append([value for value, in batch])
+
+
+@task(max_attempts=2)
+def broken():
+    raise RuntimeError('сломано')
+
+
+@override_settings(
+    TASKS_EAGER=False,
+    TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_tasks_run_by_priority_and_batch(self):
+        """Важные задачи идут первыми, пачечные - одним вызовом."""
+        record.delay('low')
+        record_batch.delay(1)
+        record_batch.delay(2)
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(calls, [[1, 2], 'low'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """Упавшая задача откладывается, а после всех попыток - failed."""
+        broken.delay()
+        run_pending()
+        item = Task.objects.get()
+        self.assertEqual((item.status, item.attempts), (Task.QUEUED, 1))
+        self.assertIn('сломано', item.last_error)
+        self.assertEqual(run_pending(), 0)
+        Task.objects.update(run_at=item.created)
+        run_pending()
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), (Task.FAILED, 2))
+
+    def test_emails_are_sent_by_worker(self):
+        """Письмо уходит только когда воркер выполнит задачу."""
+        mail.EmailMultiAlternatives(
+            'Сброс пароля', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            connection=QueuedEmailBackend(),
+        ).send()
+        self.assertEqual(len(mail.outbox), 0)
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Сброс пароля')
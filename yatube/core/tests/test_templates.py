@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.context_processors.nav import NAV_URLS, nav
+from core.templatetags.url_filters import url_to
+
+
+class TemplateUrlsTest(SimpleTestCase):
+    def test_nav_urls_match_reverse(self):
+        urls = nav(None)['nav']
+        for name, view in NAV_URLS.items():
+            with self.subTest(view=view):
+                self.assertEqual(urls[name], reverse(view))
+        self.assertIs(nav(None)['nav'], urls)
+
+    def test_url_to_matches_reverse(self):
+        cases = [
+            ('posts:post_detail', 42),
+            ('posts:profile', 'user.name+tag@example'),
+            ('posts:group_list', 'test-slug_1'),
+        ]
+        for view, value in cases:
+            with self.subTest(view=view):
+                self.assertEqual(
+                    url_to(value, view), reverse(view, args=[value])
+                )
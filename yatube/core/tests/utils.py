@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def commit_hooks(using=DEFAULT_DB_ALIAS):
+    """Выполняет хуки transaction.on_commit, добавленные в блоке.
+
+    TestCase не фиксирует транзакцию теста, и хуки сами не срабатывают,
+    а captureOnCommitCallbacks появился только в Django 3.2.
+    """
+    callbacks = connections[using].run_on_commit
+    start = len(callbacks)
+    yield
+    while len(callbacks) > start:
+        _, func = callbacks.pop(start)
+        func()
@@ -1,9 +1,42 @@
 from django.contrib import admin
+from django.db.models import QuerySet
 
+from . import deletion
 from .models import Group, Post, Comment, Follow
+from .search import matching_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class BatchDeleteMixin:
+    """Удаление из админки через posts.deletion.
+
+    Страница подтверждения считает зависимые строки запросами COUNT
+    вместо того, чтобы собирать их Collector'ом.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        if not isinstance(objs, QuerySet):
+            objs = self.model._base_manager.filter(
+                pk__in=[obj.pk for obj in objs]
+            )
+        model_count, perms_needed = {}, set()
+        for model, count in deletion.plan(objs).items():
+            opts = model._meta
+            model_count[opts.verbose_name_plural] = count
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin and not model_admin.has_delete_permission(
+                request
+            ):
+                perms_needed.add(opts.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        deletion.delete(self.model._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        deletion.delete(queryset)
+
+
+class PostAdmin(BatchDeleteMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -16,6 +49,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по тому же индексу, что и /search/, без LIKE по тексту."""
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=matching_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
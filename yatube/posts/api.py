@@ -0,0 +1,180 @@
+"""Версионированное JSON API только для чтения: ленты, пост, комментарии.
+
+Строки читаются через values_list и сразу превращаются в словари, без
+создания моделей и рендеринга шаблонов. ?fields=id,text,author выбирает
+поля ответа (в SELECT попадают только они и ключ курсора), ?cursor=
+листает страницы как в HTML-лентах.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.views.decorators.gzip import gzip_page
+
+from core.db.router import replica_reads
+
+from .models import Comment, Group, Post, User
+from .utils import (
+    COMMENTS_ON_PAGE, POSTS_ON_LIST, CommentPaginator, CursorPaginator,
+    conditional_page,
+)
+
+# Поле ответа -> путь ORM, откуда оно читается.
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+class RowsMixin:
+    """Курсор по кортежам values_list: ключ - последние столбцы строки."""
+
+    def _key(self, row):
+        return list(row[-len(self.key_fields):])
+
+
+class PostRowsPaginator(RowsMixin, CursorPaginator):
+    pass
+
+
+class CommentRowsPaginator(RowsMixin, CommentPaginator):
+    pass
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def error(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=, по умолчанию все; None, если поле неизвестно."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    if not names or any(name not in available for name in names):
+        return None
+    return names
+
+
+def serialize(rows, names):
+    """Словари ответа из кортежей: первые len(names) столбцов - поля."""
+    image = names.index('image') if 'image' in names else None
+    results = []
+    for row in rows:
+        item = dict(zip(names, row))
+        if image is not None:
+            item['image'] = (
+                settings.MEDIA_URL + row[image] if row[image] else None
+            )
+        results.append(item)
+    return results
+
+
+def rows_page(request, queryset, available, paginator_class, per_page):
+    """Страница строк с выбранными полями и курсорами соседних страниц."""
+    names = requested_fields(request, available)
+    if names is None:
+        return error(
+            f'Допустимые поля: {", ".join(available)}', status=400
+        )
+    key = [field for field, _ in paginator_class.key_fields]
+    rows = queryset.values_list(
+        *[available[name] for name in names], *key
+    )
+    page = paginator_class(rows, per_page).get_page(
+        request.GET.get('cursor')
+    )
+    return json_response({
+        'results': serialize(page, names),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def posts_page(request, queryset):
+    return rows_page(
+        request, queryset, POST_FIELDS, PostRowsPaginator, POSTS_ON_LIST
+    )
+
+
+@gzip_page
+@replica_reads
+@conditional_page('posts')
+def index(request):
+    return posts_page(request, Post.objects.all())
+
+
+@gzip_page
+@replica_reads
+@conditional_page('posts')
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return error('Группа не найдена', status=404)
+    return posts_page(request, Post.objects.filter(group_id=group_id))
+
+
+@gzip_page
+@replica_reads
+@conditional_page('posts')
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return error('Пользователь не найден', status=404)
+    return posts_page(request, Post.objects.filter(author_id=author_id))
+
+
+@gzip_page
+@replica_reads
+@conditional_page('posts', 'comments:{post_id}')
+def post_detail(request, post_id):
+    names = requested_fields(request, POST_FIELDS)
+    if names is None:
+        return error(
+            f'Допустимые поля: {", ".join(POST_FIELDS)}', status=400
+        )
+    row = Post.objects.filter(pk=post_id).values_list(
+        *[POST_FIELDS[name] for name in names]
+    ).first()
+    if row is None:
+        return error('Пост не найден', status=404)
+    return json_response(serialize([row], names)[0])
+
+
+@gzip_page
+@replica_reads
+@conditional_page('comments:{post_id}')
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error('Пост не найден', status=404)
+    return rows_page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        CommentRowsPaginator,
+        COMMENTS_ON_PAGE,
+    )
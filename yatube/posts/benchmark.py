@@ -0,0 +1,359 @@
+"""Нагрузочный стенд: генерация данных и прогон смешанной нагрузки.
+
+seed() заполняет базу пачками bulk_create: популярность авторов и
+подписки распределены по Ципфу (немного авторов с огромным числом
+подписчиков и длинный хвост), часть постов с картинками. replay()
+гоняет через тестовый клиент смесь запросов к лентам, посту и API и
+для каждого представления считает p50/p99 времени ответа, запросы к БД
+и пик памяти. Результат - словарь для JSON, compare() сравнивает два
+таких результата. См. команду benchmark.
+"""
+import io
+import itertools
+import math
+import random
+import resource
+import time
+import tracemalloc
+from bisect import bisect
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import counters
+from .models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+from .utils import chunked, explicit_dates
+
+User = get_user_model()
+
+CHUNK_SIZE = 5000
+# Показатель распределения Ципфа для популярности авторов и постов.
+ZIPF_EXPONENT = 1.1
+IMAGE_COLORS = ('#c0392b', '#2980b9', '#27ae60', '#8e44ad', '#f39c12')
+
+# Представление -> (вес в смеси, нужен ли вход).
+WORKLOAD = {
+    'posts:index': (30, False),
+    'posts:group_list': (10, False),
+    'posts:profile': (15, False),
+    'posts:post_detail': (20, False),
+    'posts:follow_index': (10, True),
+    'posts:add_comment': (3, True),
+    'api:index': (6, False),
+    'api:post_comments': (6, False),
+}
+
+
+class Zipf:
+    """Случайный выбор из items с весом 1 / rank ** ZIPF_EXPONENT."""
+
+    def __init__(self, items, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** ZIPF_EXPONENT for rank in range(1, len(items) + 1)
+        ))
+
+    def __call__(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect(self.cum_weights, point)]
+
+
+def bulk_insert(model, objects):
+    """Вставляет объекты пачками по CHUNK_SIZE, каждую в своей транзакции."""
+    for chunk in chunked(objects, CHUNK_SIZE):
+        with transaction.atomic():
+            model.objects.bulk_create(chunk)
+
+
+def make_images(count):
+    """Сохраняет count картинок-заготовок и возвращает их имена."""
+    names = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new(
+            'RGB', (960, 540), IMAGE_COLORS[i % len(IMAGE_COLORS)]
+        ).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/bench_{i}.jpg', buffer
+        ))
+    return names
+
+
+WORDS = ('лес', 'море', 'город', 'кот', 'чай', 'день', 'книга', 'снег')
+
+
+def _posts(count, author, group_ids, images, image_share, rng):
+    now = timezone.now()
+    for i in range(count):
+        words = rng.choices(WORDS, k=rng.randint(5, 60))
+        yield Post(
+            author_id=author(),
+            group_id=rng.choice(group_ids) if rng.random() < 0.7 else None,
+            text=f'Пост {i}: {" ".join(words)}',
+            image=rng.choice(images) if rng.random() < image_share else '',
+            pub_date=now - timedelta(minutes=count - i),
+        )
+
+
+def _follows(user_ids, per_user, author):
+    pairs = set()
+    for user_id in user_ids:
+        for _ in range(per_user):
+            author_id = author()
+            if author_id != user_id:
+                pairs.add((user_id, author_id))
+    for user_id, author_id in pairs:
+        yield Follow(user_id=user_id, author_id=author_id)
+
+
+def _timeline(user_id):
+    """Лента подписок читателя одним запросом, как её собрал бы push_post.
+
+    timeline.backfill по каждой подписке подрезает ленту после каждого
+    автора, а на тысячах подписок это слишком долго для заполнения.
+    Возвращает записи и границу ленты - дату первого не вошедшего поста,
+    как её ставит timeline.trim.
+    """
+    posts = list(Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).order_by('-pub_date', '-pk').values_list(
+        'pk', 'author_id', 'pub_date'
+    )[:settings.TIMELINE_SIZE + 1])
+    horizon = (
+        posts.pop()[2] if len(posts) > settings.TIMELINE_SIZE else None
+    )
+    entries = [
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in posts
+    ]
+    return entries, horizon
+
+
+def seed(users=1000, posts=100000, groups=50, follows=20, comments=50000,
+         image_share=0.2, readers=50, rng=None):
+    """Заполняет пустую базу и возвращает table_counts().
+
+    Сигналы при bulk_create не срабатывают, поэтому счётчики
+    пересчитываются в конце, а ленты подписок заполняются только для
+    первых readers пользователей - от их имени идут запросы replay().
+    """
+    rng = rng or random.Random(0)
+    bulk_insert(User, (
+        User(username=f'bench{i}', password='!') for i in range(users)
+    ))
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    bulk_insert(Group, (
+        Group(title=f'Группа {i}', slug=f'bench-{i}', description='')
+        for i in range(groups)
+    ))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+
+    # Первые пользователи - самые популярные авторы.
+    author = Zipf(user_ids, rng)
+    images = make_images(len(IMAGE_COLORS)) if image_share else []
+    with explicit_dates(Post, 'pub_date'):
+        bulk_insert(Post, _posts(
+            posts, author, group_ids, images, image_share, rng
+        ))
+    bulk_insert(Follow, _follows(user_ids, follows, author))
+
+    # Комментарии достаются в основном свежим постам.
+    recent = list(Post.objects.order_by('-pub_date', '-pk').values_list(
+        'pk', flat=True
+    )[:max(posts // 10, 1)])
+    if recent:
+        post = Zipf(recent, rng)
+        bulk_insert(Comment, (
+            Comment(
+                post_id=post(), author_id=rng.choice(user_ids),
+                text=f'Комментарий {i}',
+            ) for i in range(comments)
+        ))
+
+    with transaction.atomic():
+        counters.rebuild()
+    for user_id in user_ids[:readers]:
+        entries, horizon = _timeline(user_id)
+        bulk_insert(TimelineEntry, entries)
+        UserStats.objects.filter(user_id=user_id).update(
+            timeline_horizon=horizon
+        )
+    return table_counts()
+
+
+def table_counts():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'image_posts': Post.objects.exclude(image='').count(),
+        'follows': Follow.objects.count(),
+        'comments': Comment.objects.count(),
+    }
+
+
+class Replay:
+    """Смешанная нагрузка по WORKLOAD от анонимов и readers пользователей."""
+
+    def __init__(self, readers=50, rng=None):
+        self.rng = rng or random.Random(0)
+        users = list(User.objects.order_by('pk').values_list(
+            'pk', 'username'
+        ))
+        self.clients = []
+        for user in User.objects.filter(
+            pk__in=[user_id for user_id, _ in users[:readers]]
+        ):
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+        self.anonymous = Client()
+        self.author = Zipf([username for _, username in users], self.rng)
+        self.post = Zipf(list(Post.objects.order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True)[:1000]), self.rng)
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.views = list(WORKLOAD)
+        self.weights = [weight for weight, _ in WORKLOAD.values()]
+
+    def request(self, view):
+        """Клиент, метод, адрес и данные одного запроса к view."""
+        login = WORKLOAD[view][1] or self.rng.random() < 0.3
+        client = (
+            self.rng.choice(self.clients) if login and self.clients
+            else self.anonymous
+        )
+        if view in ('posts:index', 'posts:follow_index', 'api:index'):
+            return client, 'get', reverse(view), None
+        if view == 'posts:group_list':
+            return client, 'get', reverse(
+                view, args=[self.rng.choice(self.groups)]
+            ), None
+        if view == 'posts:profile':
+            return client, 'get', reverse(view, args=[self.author()]), None
+        url = reverse(view, args=[self.post()])
+        if view == 'posts:add_comment':
+            return client, 'post', url, {'text': 'Комментарий из нагрузки'}
+        return client, 'get', url, None
+
+    def run(self, view):
+        """Выполняет запрос; возвращает (секунды, запросы к БД)."""
+        client, method, url, data = self.request(view)
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(count):
+            response = getattr(client, method)(url, data)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{method.upper()} {url}: {response.status_code}'
+            )
+        return elapsed, queries
+
+    def next_view(self):
+        return self.rng.choices(self.views, self.weights)[0]
+
+
+def percentile(values, share):
+    """Значение, не меньше которого доля share наблюдений (nearest-rank)."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def replay(requests=2000, warmup=100, memory_samples=10, readers=50,
+           rng=None):
+    """Прогоняет смесь запросов и возвращает метрики по представлениям.
+
+    Время и запросы меряются без tracemalloc (он замедляет Python в
+    разы); пик памяти на запрос - отдельным проходом по memory_samples
+    запросов к каждому представлению.
+    """
+    workload = Replay(readers=readers, rng=rng)
+    for _ in range(warmup):
+        workload.run(workload.next_view())
+
+    samples = {view: [] for view in WORKLOAD}
+    started = time.perf_counter()
+    for _ in range(requests):
+        view = workload.next_view()
+        samples[view].append(workload.run(view))
+    elapsed = time.perf_counter() - started
+
+    memory = {}
+    tracemalloc.start()
+    try:
+        for view in WORKLOAD:
+            peaks = []
+            for _ in range(memory_samples):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                workload.run(view)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            memory[view] = max(peaks, default=0)
+    finally:
+        tracemalloc.stop()
+
+    views = {}
+    for view, runs in samples.items():
+        if not runs:
+            continue
+        latencies = [seconds * 1000 for seconds, _ in runs]
+        queries = [count for _, count in runs]
+        views[view] = {
+            'requests': len(runs),
+            'p50_ms': round(percentile(latencies, 0.5), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+            'peak_memory_kb': round(memory[view] / 1024, 1),
+        }
+    latencies = [
+        seconds * 1000 for runs in samples.values() for seconds, _ in runs
+    ]
+    return {
+        'views': views,
+        'total': {
+            'requests': requests,
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.5), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+        },
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(baseline, current):
+    """Строки (представление, метрика, было, стало, изменение в %)."""
+    rows = []
+    views = {**current['views'], 'total': current['total']}
+    old_views = {**baseline['views'], 'total': baseline['total']}
+    for view, metrics in views.items():
+        old = old_views.get(view)
+        if old is None:
+            continue
+        for name in ('p50_ms', 'p99_ms', 'mean_queries'):
+            if name not in metrics or not old.get(name):
+                continue
+            change = (metrics[name] - old[name]) / old[name] * 100
+            rows.append((view, name, old[name], metrics[name], change))
+    return rows
@@ -0,0 +1,170 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Сигналы ставят сдвиги счётчиков в очередь задач, воркер складывает
+сдвиги пачки и обновляет каждую строку одним UPDATE. Страницы читают
+готовые числа вместо COUNT(*). rebuild() и mismatches() пересчитывают
+их с нуля, см. команду rebuild_counters.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.tasks import task
+
+from . import timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .utils import bump_generation
+
+
+def _count(model, field, outer='pk'):
+    """Подзапрос COUNT(*) строк model, ссылающихся на внешнюю строку."""
+    rows = model.objects.filter(
+        **{field: OuterRef(outer)}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _user_counts():
+    return {
+        name: _count(model, field, outer='user_id')
+        for name, (model, field) in USER_COUNTERS.items()
+    }
+
+
+def rebuild_user(user_id):
+    """Пересчитывает счётчики одного пользователя и возвращает их."""
+    stats, _ = UserStats.objects.get_or_create(user_id=user_id)
+    UserStats.objects.filter(pk=stats.pk).update(**_user_counts())
+    stats.refresh_from_db()
+    return stats
+
+
+def user_stats(user):
+    """Счётчики пользователя; отсутствующая строка пересчитывается.
+
+    Если пользователь выбран с select_related('stats'), запроса нет.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return rebuild_user(user.pk)
+
+
+# Строки счётчиков: вид -> (модель, поле с ключом строки).
+COUNTER_ROWS = {
+    'user': (UserStats, 'user_id'),
+    'group': (Group, 'pk'),
+    'post': (Post, 'pk'),
+}
+
+
+def _generations(kind, row_id, deltas):
+    """Поколения кэша, страницы которых показывают изменённые счётчики."""
+    names = {'posts'}
+    if kind == 'post':
+        names.add(f'comments:{row_id}')
+    elif kind == 'user' and (
+        'followers_count' in deltas or 'following_count' in deltas
+    ):
+        names.add(f'follows:{row_id}')
+    return names
+
+
+@task(priority=4, batch=True)
+def apply_deltas(batch):
+    """Складывает сдвиги пачки: одна строка - один UPDATE.
+
+    Воркер применяет сдвиги позже запроса, поэтому и поколения кэша
+    страниц со счётчиками начинаются заново здесь, после UPDATE.
+    """
+    totals = defaultdict(Counter)
+    for kind, row_id, deltas in batch:
+        totals[kind, row_id].update(deltas)
+    generations = set()
+    for (kind, row_id), deltas in totals.items():
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if deltas:
+            model, key = COUNTER_ROWS[kind]
+            model.objects.filter(**{key: row_id}).update(**{
+                name: F(name) + delta for name, delta in deltas.items()
+            })
+            generations |= _generations(kind, row_id, deltas)
+            if kind == 'user' and deltas.get('followers_count', 0) < 0:
+                _check_fanout(row_id, deltas['followers_count'])
+    for name in generations:
+        bump_generation(name)
+
+
+def _check_fanout(user_id, delta):
+    """Автор, у которого подписчиков стало не больше порога ленты,
+    снова раскладывает посты; написанные до этого дописываются в ленты."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if settings.TIMELINE_ENABLED and UserStats.objects.filter(
+        user_id=user_id,
+        followers_count__lte=limit,
+        followers_count__gt=limit + delta,
+    ).exists():
+        timeline.backfill_followers.delay(user_id)
+
+
+def change_user(user_id, **deltas):
+    """Сдвигает счётчики; строку без счётчиков пересчитает user_stats()."""
+    apply_deltas.delay('user', user_id, deltas)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        apply_deltas.delay('group', group_id, {'posts_count': delta})
+
+
+def change_post(post_id, delta):
+    apply_deltas.delay('post', post_id, {'comments_count': delta})
+
+
+def rebuild():
+    """Пересчитывает все счётчики с нуля."""
+    UserStats.objects.bulk_create([
+        UserStats(user_id=user_id)
+        for user_id in User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)
+    ], ignore_conflicts=True)
+    UserStats.objects.update(**_user_counts())
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
+
+
+def mismatches():
+    """Возвращает строки вида (модель, pk, поле, хранится, на самом деле)."""
+    result = []
+    checks = [
+        (UserStats.objects.all(), _user_counts()),
+        (Group.objects.all(), {'posts_count': _count(Post, 'group')}),
+        (Post.objects.all(), {'comments_count': _count(Comment, 'post')}),
+    ]
+    for queryset, counts in checks:
+        actual = {f'actual_{name}': value for name, value in counts.items()}
+        fields = ['pk', *counts, *actual]
+        rows = queryset.order_by().annotate(**actual).values(*fields)
+        for row in rows.iterator():
+            for name in counts:
+                if row[name] != row[f'actual_{name}']:
+                    result.append((
+                        queryset.model.__name__, row['pk'], name,
+                        row[name], row[f'actual_{name}'],
+                    ))
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    for user_id in missing:
+        result.append((User.__name__, user_id, 'stats', None, None))
+    return result
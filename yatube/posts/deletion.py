@@ -0,0 +1,198 @@
+"""Удаление пользователей и постов с большой историей пачками.
+
+Model.delete() собирает через Collector все зависимые строки в память и
+шлёт сигналы на каждую. Здесь зависимые строки удаляются снизу вверх
+пачками по BATCH_SIZE id, каждая пачка - прямым DELETE в своей короткой
+транзакции. Последствия, которые делали бы сигналы (счётчики, поколения
+кэша лент, файлы картинок), применяются по EFFECTS один раз на пачку.
+
+Удаление не атомарно целиком: прерванное можно повторить, оно
+продолжится с оставшихся строк, а сама удаляемая строка исчезает
+последней. delete_user и delete_post - фоновые задачи, их прогресс
+лежит в кэше (см. progress).
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import CASCADE, DO_NOTHING, SET_NULL
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+from core.tasks import task
+
+from . import counters, thumbnails
+from .models import Comment, Follow, Post, User
+from .utils import bump_generation
+
+BATCH_SIZE = 500
+# Сколько хранится прогресс законченного удаления, в секундах.
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+
+def _posts_deleted(rows):
+    for author_id, count in Counter(row[0] for row in rows).items():
+        counters.change_user(author_id, posts_count=-count)
+    for group_id, count in Counter(row[1] for row in rows).items():
+        counters.change_group(group_id, -count)
+    images = sorted({image for _, _, image in rows if image})
+    if images:
+        thumbnails.remove_images.delay(images)
+    bump_generation('posts')
+
+
+def _comments_deleted(rows):
+    for post_id, count in Counter(post_id for post_id, in rows).items():
+        counters.change_post(post_id, -count)
+        bump_generation(f'comments:{post_id}')
+
+
+def _follows_deleted(rows):
+    for user_id, count in Counter(user for user, _ in rows).items():
+        counters.change_user(user_id, following_count=-count)
+        bump_generation(f'follows:{user_id}')
+    for author_id, count in Counter(author for _, author in rows).items():
+        counters.change_user(author_id, followers_count=-count)
+
+
+# Модель -> (поля удаляемых строк, последствия удаления пачки таких строк).
+EFFECTS = {
+    Post: (('author_id', 'group_id', 'image'), _posts_deleted),
+    Comment: (('post_id',), _comments_deleted),
+    Follow: (('user_id', 'author_id'), _follows_deleted),
+}
+
+
+def _relations(model):
+    """Связи на model, которые Collector обошёл бы при удалении."""
+    for relation in get_candidate_relations_to_delete(model._meta):
+        if relation.on_delete not in (CASCADE, SET_NULL, DO_NOTHING):
+            raise ValueError(
+                f'{relation.related_model.__name__}.{relation.field.name}: '
+                f'удаление пачками не поддерживает {relation.on_delete}'
+            )
+        if relation.on_delete is not DO_NOTHING:
+            yield relation
+
+
+def _dependants(relation, parents):
+    return relation.related_model._base_manager.filter(**{
+        f'{relation.field.name}__in': parents
+    })
+
+
+def plan(queryset):
+    """Сколько строк каких моделей удалит удаление queryset.
+
+    Считается запросами COUNT с подзапросами, без выборки строк; строки,
+    достижимые по двум связям (подписки, записи лент), считаются дважды.
+    """
+    counts = Counter()
+    count = queryset.count()
+    if not count:
+        return counts
+    counts[queryset.model] += count
+    for relation in _relations(queryset.model):
+        if relation.on_delete is CASCADE:
+            counts.update(plan(_dependants(
+                relation, queryset.values('pk')
+            )))
+    return counts
+
+
+def delete(queryset, batch_size=BATCH_SIZE):
+    """Удаляет queryset пачками; возвращает число строк по моделям."""
+    worker = Purge(batch_size=batch_size)
+    worker(queryset)
+    return worker.deleted
+
+
+class Purge:
+    """Удаляет строки queryset и всё, что от них зависит, пачками.
+
+    report(модель, удалено) вызывается после каждой пачки.
+    """
+
+    def __init__(self, report=None, batch_size=BATCH_SIZE):
+        self.report = report
+        self.batch_size = batch_size
+        self.deleted = Counter()
+
+    def __call__(self, queryset):
+        model = queryset.model
+        fields, effect = EFFECTS.get(model, ((), None))
+        while True:
+            ids = list(
+                queryset.values_list('pk', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return
+            for relation in _relations(model):
+                dependants = _dependants(relation, ids)
+                if relation.on_delete is CASCADE:
+                    self(dependants)
+                else:
+                    dependants.update(**{relation.field.name: None})
+            with transaction.atomic():
+                batch = model._base_manager.filter(pk__in=ids)
+                rows = list(batch.values_list(*fields)) if effect else ()
+                batch._raw_delete(router.db_for_write(model))
+                if effect:
+                    effect(rows)
+            self.deleted[model] += len(ids)
+            if self.report:
+                self.report(model, len(ids))
+
+
+def _progress_key(model, pk):
+    return f'deletion:{model._meta.label_lower}:{pk}'
+
+
+def progress(model, pk):
+    """Прогресс фонового удаления или None, если его не было."""
+    return cache.get(_progress_key(model, pk))
+
+
+def purge(model, pk, on_progress=None):
+    """Удаляет объект model с первичным ключом pk, сохраняя прогресс.
+
+    Прогресс - словарь: удалено и всего строк (оценка plan), удалено по
+    моделям и признак завершения; после каждой пачки он передаётся и в
+    on_progress.
+    """
+    key = _progress_key(model, pk)
+    queryset = model._base_manager.filter(pk=pk)
+    state = {
+        'total': sum(plan(queryset).values()),
+        'deleted': 0,
+        'models': {},
+        'done': False,
+    }
+
+    def save():
+        cache.set(key, state, PROGRESS_TIMEOUT)
+        if on_progress:
+            on_progress(state)
+
+    def report(deleted_model, count):
+        state['deleted'] += count
+        label = deleted_model._meta.label
+        state['models'][label] = state['models'].get(label, 0) + count
+        save()
+
+    save()
+    Purge(report)(queryset)
+    state['done'] = True
+    save()
+    return state
+
+
+@task(priority=1, max_attempts=5)
+def delete_user(user_id):
+    """Фоновое удаление пользователя со всеми постами и подписками."""
+    purge(User, user_id)
+
+
+@task(priority=1, max_attempts=5)
+def delete_post(post_id):
+    """Фоновое удаление поста со всеми комментариями."""
+    purge(Post, post_id)
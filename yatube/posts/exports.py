@@ -0,0 +1,163 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются через values_list(...).iterator(chunk_size=CHUNK_SIZE)
+и сразу превращаются в строки JSONL или CSV, так что память не растёт
+с объёмом данных. Поля постов и подписок совпадают с форматами команд
+import_posts и import_follows. В zip-архив кладутся все наборы и
+картинки постов из хранилища; архив пишется в поток, без временных
+файлов.
+"""
+import csv
+import io
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+from .utils import chunked
+
+CHUNK_SIZE = 2000
+FORMATS = ('jsonl', 'csv', 'zip')
+# Сколько байт архива копится перед отдачей клиенту.
+ZIP_FLUSH_SIZE = 64 * 1024
+MEDIA_DIR = 'media'
+
+# Набор -> (модель, поле выгрузки -> путь ORM, поле владельца).
+DATASETS = {
+    'posts': (Post, {
+        'id': 'pk',
+        'text': 'text',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    }, 'author'),
+    'comments': (Comment, {
+        'id': 'pk',
+        'post': 'post_id',
+        'text': 'text',
+        'author': 'author__username',
+        'created': 'created',
+    }, 'author'),
+    'follows': (Follow, {
+        'follower': 'user__username',
+        'author': 'author__username',
+    }, 'user'),
+}
+
+
+def rows(name, user=None):
+    """Кортежи набора name по первичному ключу; для user - только его."""
+    model, fields, owner = DATASETS[name]
+    queryset = model.objects.order_by('pk')
+    if user is not None:
+        queryset = queryset.filter(**{owner: user})
+    return queryset.values_list(*fields.values()).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+class _Echo:
+    """Приёмник csv.writer, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def lines(name, fmt, user=None):
+    """Строки набора в JSONL или CSV (с заголовком)."""
+    names = list(DATASETS[name][1])
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        for row in rows(name, user):
+            yield writer.writerow(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row
+            )
+        return
+    for row in rows(name, user):
+        yield json.dumps(
+            dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+class _Buffer(io.RawIOBase):
+    """Поток без перемотки, из которого генератор забирает байты архива."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def _media(user=None):
+    """Имена картинок постов набора, по одному разу подряд идущих."""
+    model, _, owner = DATASETS['posts']
+    queryset = model.objects.exclude(image='').order_by('image')
+    if user is not None:
+        queryset = queryset.filter(**{owner: user})
+    previous = None
+    for name in queryset.values_list('image', flat=True).iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        if name != previous and default_storage.exists(name):
+            yield name
+        previous = name
+
+
+def archive(fmt='jsonl', user=None, datasets=DATASETS):
+    """Байты zip-архива: наборы в формате fmt и картинки их постов.
+
+    В памяти держатся только ещё не отданные ~ZIP_FLUSH_SIZE байт и
+    оглавление архива (по записи на файл).
+    """
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name in datasets:
+            with zip_file.open(
+                f'{name}.{fmt}', 'w', force_zip64=True
+            ) as entry:
+                for chunk in chunked(lines(name, fmt, user), CHUNK_SIZE):
+                    entry.write(''.join(chunk).encode())
+                    if buffer.size >= ZIP_FLUSH_SIZE:
+                        yield buffer.drain()
+        if 'posts' in datasets:
+            for name in _media(user):
+                info = zipfile.ZipInfo(f'{MEDIA_DIR}/{name}')
+                # Картинки уже сжаты.
+                info.compress_type = zipfile.ZIP_STORED
+                with default_storage.open(name) as source, zip_file.open(
+                    info, 'w', force_zip64=True
+                ) as entry:
+                    for data in iter(
+                        lambda: source.read(ZIP_FLUSH_SIZE), b''
+                    ):
+                        entry.write(data)
+                        yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream(fmt, user=None, name=None):
+    """Выгрузка для StreamingHttpResponse или файла: куски str или bytes.
+
+    Для jsonl и csv выгружается один набор name, zip содержит все.
+    """
+    if fmt == 'zip':
+        return archive(user=user)
+    return lines(name, fmt, user)
@@ -0,0 +1,179 @@
+"""Подписки пачками: кнопки профиля, массовая подписка и импорт графа.
+
+Строки Follow вставляются bulk_create(ignore_conflicts=True) и
+удаляются одним DELETE по пачке, поэтому сигналы Follow не
+срабатывают: счётчики, ленты подписок и кэш ленты обновляются здесь
+один раз на пачку. Гонка с уникальностью unique_follow не ломает
+запрос - конфликтующая строка просто пропускается.
+
+Граф подписок читается построчно из CSV или JSONL (follower, author,
+action) и обрабатывается пачками по CHUNK_SIZE, так что память не
+растёт с размером файла.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+
+from . import counters, timeline
+from .models import Follow, User
+from .utils import LookupCache, bump_generation, chunked
+
+CHUNK_SIZE = 500
+# Сколько имён пользователей держит кэш импорта.
+USERNAME_CACHE_SIZE = 100000
+FORMATS = ('csv', 'jsonl')
+ACTIONS = ('follow', 'unfollow')
+FIELDS = ('follower', 'author', 'action')
+
+
+def _existing(pairs):
+    """Какие из пар (подписчик, автор) уже есть в таблице."""
+    authors = defaultdict(list)
+    for user_id, author_id in pairs:
+        authors[user_id].append(author_id)
+    if not authors:
+        return set()
+    condition = reduce(or_, (
+        Q(user_id=user_id, author_id__in=author_ids)
+        for user_id, author_ids in authors.items()
+    ))
+    return set(Follow.objects.filter(condition).values_list(
+        'user_id', 'author_id'
+    ))
+
+
+def _changed(pairs, delta):
+    """Счётчики, ленты и кэш после появления (1) или удаления (-1) пар."""
+    if not pairs:
+        return
+    for user_id, count in Counter(user for user, _ in pairs).items():
+        counters.change_user(user_id, following_count=delta * count)
+    for author_id, count in Counter(author for _, author in pairs).items():
+        counters.change_user(author_id, followers_count=delta * count)
+    if settings.TIMELINE_ENABLED:
+        timeline.sync_follows.delay(sorted(pairs))
+    for user_id in {user for user, _ in pairs}:
+        bump_generation(f'follows:{user_id}')
+
+
+def follow(pairs):
+    """Создаёт подписки (подписчик, автор); возвращает число новых."""
+    created = 0
+    for chunk in chunked(pairs, CHUNK_SIZE):
+        chunk = {(user, author) for user, author in chunk if user != author}
+        with transaction.atomic():
+            new = chunk - _existing(chunk)
+            Follow.objects.bulk_create([
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in new
+            ], ignore_conflicts=True)
+            _changed(new, 1)
+        created += len(new)
+    return created
+
+
+def unfollow(pairs):
+    """Удаляет подписки (подписчик, автор); возвращает число удалённых."""
+    deleted = 0
+    for chunk in chunked(pairs, CHUNK_SIZE):
+        with transaction.atomic():
+            gone = _existing(chunk)
+            if gone:
+                # Прямой DELETE без выборки строк для сигналов: их
+                # последствия _changed() применяет за всю пачку.
+                Follow.objects.filter(reduce(or_, (
+                    Q(user_id=user_id, author_id=author_id)
+                    for user_id, author_id in gone
+                )))._raw_delete(router.db_for_write(Follow))
+            _changed(gone, -1)
+        deleted += len(gone)
+    return deleted
+
+
+def set_following(user_id, author_ids):
+    """Делает подписки пользователя ровно author_ids.
+
+    Возвращает (подписался, отписался): разницы множеств желаемых и
+    текущих авторов.
+    """
+    wanted = set(author_ids) - {user_id}
+    current = set(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    ))
+    return (
+        follow((user_id, author_id) for author_id in wanted - current),
+        unfollow((user_id, author_id) for author_id in current - wanted),
+    )
+
+
+def json_rows(data):
+    """Строки графа из JSON {"follow": [имена], "unfollow": [имена]}."""
+    if not isinstance(data, dict):
+        raise ValueError('Ожидается объект с полями follow и unfollow')
+    rows = []
+    for action in ACTIONS:
+        names = data.get(action, [])
+        if not isinstance(names, list) or not all(
+            isinstance(name, str) for name in names
+        ):
+            raise ValueError(f'{action}: ожидается список имён')
+        rows.extend({'author': name, 'action': action} for name in names)
+    return rows
+
+
+def _check_row(row):
+    if not isinstance(row, dict) or not all(
+        isinstance(row.get(field), (str, type(None))) for field in FIELDS
+    ):
+        raise ValueError(
+            f'Ожидается объект со строками {", ".join(FIELDS)}: {row!r}'
+        )
+
+
+class GraphImport:
+    """Применяет поток строк графа подписок пачками.
+
+    Имена пользователей переводятся в id через ограниченный кэш: на
+    пачку - один запрос за новыми именами. Если follower задан, все
+    строки считаются подписками этого пользователя.
+    """
+
+    def __init__(self, follower=None):
+        self.follower = follower
+        self.users = LookupCache(User, 'username', USERNAME_CACHE_SIZE)
+        self.stats = Counter(followed=0, unfollowed=0, unknown=0, invalid=0)
+
+    def pairs(self, rows):
+        """Пары id по действиям; строки с ошибками только считаются."""
+        names = set()
+        for row in rows:
+            _check_row(row)
+            names.add(row.get('author'))
+            names.add(row.get('follower'))
+        ids = self.users.resolve(names)
+        actions = {action: [] for action in ACTIONS}
+        for row in rows:
+            action = row.get('action') or 'follow'
+            user_id = (
+                self.follower.pk if self.follower
+                else ids.get(row.get('follower'))
+            )
+            author_id = ids.get(row.get('author'))
+            if action not in ACTIONS or not row.get('author'):
+                self.stats['invalid'] += 1
+            elif user_id is None or author_id is None:
+                self.stats['unknown'] += 1
+            else:
+                actions[action].append((user_id, author_id))
+        return actions
+
+    def run(self, rows):
+        for chunk in chunked(rows, CHUNK_SIZE):
+            actions = self.pairs(chunk)
+            self.stats['followed'] += follow(actions['follow'])
+            self.stats['unfollowed'] += unfollow(actions['unfollow'])
+        return dict(self.stats)
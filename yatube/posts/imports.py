@@ -0,0 +1,191 @@
+"""Импорт исторических постов из выгрузок CSV и JSONL.
+
+Записи (text, author, group, pub_date, image) читаются потоком и
+обрабатываются пачками: авторы и группы переводятся в id через
+ограниченные кэши, картинки сохраняются и получают миниатюры в пуле
+процессов, а посты пачки вставляются одним bulk_create в своей
+транзакции. Сигналы Post при этом не срабатывают, поэтому счётчики,
+поисковый индекс, ленты подписок и поколение кэша лент обновляются
+здесь один раз на пачку.
+
+После каждой пачки вызывающий может записать контрольную точку - число
+обработанных записей - и продолжить с неё после сбоя.
+"""
+import itertools
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, search, thumbnails, timeline
+from .models import Group, Post, User
+from .utils import LookupCache, bump_generation, chunked, explicit_dates
+
+BATCH_SIZE = 1000
+# Сколько имён авторов и слагов групп держат кэши импорта.
+LOOKUP_CACHE_SIZE = 100000
+
+
+def store_image(path):
+    """Сохраняет картинку в хранилище, создаёт миниатюры и возвращает имя.
+
+    Выполняется в процессах пула, поэтому принимает и возвращает только
+    строки.
+    """
+    field = Post._meta.get_field('image')
+    with open(path, 'rb') as source:
+        name = default_storage.save(
+            field.generate_filename(None, os.path.basename(path)),
+            File(source),
+        )
+    thumbnails.generate(name)
+    return name
+
+
+FIELDS = ('text', 'author', 'group', 'pub_date', 'image')
+
+
+def _parse_date(value):
+    """Дата записи или None, если её нет или такой даты не бывает."""
+    try:
+        pub_date = parse_datetime(value or '')
+        if pub_date and timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+    except ValueError:
+        return None
+    return pub_date
+
+
+def _is_record(row):
+    """Запись - объект, поля которого строки или пусты."""
+    return isinstance(row, dict) and all(
+        isinstance(row.get(field), (str, type(None))) for field in FIELDS
+    )
+
+
+def _not_imported(parsed):
+    """Пары (пост, картинка), постов которых ещё нет в базе.
+
+    Пачка могла закоммититься, а контрольная точка - не успеть
+    записаться; такие посты узнаются по автору, дате и тексту.
+    """
+    existing = set(Post.objects.filter(
+        author_id__in={post.author_id for post, _ in parsed},
+        pub_date__in={post.pub_date for post, _ in parsed},
+    ).values_list('author_id', 'pub_date', 'text'))
+    return [
+        (post, image) for post, image in parsed
+        if (post.author_id, post.pub_date, post.text) not in existing
+    ]
+
+
+class PostImport:
+    """Загружает поток записей постов пачками по batch_size.
+
+    images_dir - каталог, от которого отсчитываются пути картинок;
+    pool - исполнитель с методом map для картинок, без него они
+    обрабатываются в текущем процессе.
+    """
+
+    def __init__(self, images_dir='', pool=None, batch_size=BATCH_SIZE):
+        self.images_dir = images_dir
+        self.map = pool.map if pool else map
+        self.batch_size = batch_size
+        self.authors = LookupCache(User, 'username', LOOKUP_CACHE_SIZE)
+        self.groups = LookupCache(Group, 'slug', LOOKUP_CACHE_SIZE)
+        self.stats = Counter(
+            imported=0, duplicates=0, invalid=0, unknown=0, missing_images=0
+        )
+
+    def parse(self, rows):
+        """Посты пачки с путями картинок; ошибочные записи только считаются."""
+        records = [row for row in rows if _is_record(row)]
+        self.stats['invalid'] += len(rows) - len(records)
+        rows = records
+        authors = self.authors.resolve(row.get('author') for row in rows)
+        groups = self.groups.resolve(row.get('group') for row in rows)
+        posts = []
+        for row in rows:
+            pub_date = _parse_date(row.get('pub_date'))
+            if not row.get('text') or not row.get('author') or not pub_date:
+                self.stats['invalid'] += 1
+                continue
+            author_id = authors[row['author']]
+            group_id = groups.get(row.get('group'))
+            if author_id is None or (row.get('group') and group_id is None):
+                self.stats['unknown'] += 1
+                continue
+            post = Post(
+                text=row['text'], author_id=author_id, group_id=group_id,
+                pub_date=pub_date,
+            )
+            posts.append((post, row.get('image') or ''))
+        return posts
+
+    def store_images(self, posts):
+        """Передаёт картинки пачки пулу и проставляет постам их имена."""
+        pending = []
+        for post, image in posts:
+            path = os.path.join(self.images_dir, image) if image else ''
+            if path and not os.path.isfile(path):
+                self.stats['missing_images'] += 1
+            elif path:
+                pending.append((post, path))
+        # Одна и та же картинка пачки сохраняется один раз.
+        paths = list(dict.fromkeys(path for _, path in pending))
+        names = dict(zip(paths, self.map(store_image, paths)))
+        for post, path in pending:
+            post.image = names[path]
+
+    def insert(self, posts):
+        """Вставляет пачку и применяет то, что сделали бы сигналы Post."""
+        with explicit_dates(Post, 'pub_date'), transaction.atomic():
+            last = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ).first() or 0
+            Post.objects.bulk_create(posts)
+            # SQLite не возвращает id из bulk_create, а AUTOINCREMENT
+            # выдаёт их по возрастанию.
+            post_ids = list(Post.objects.filter(pk__gt=last).values_list(
+                'pk', flat=True
+            ))
+            search.reindex_posts([[post_id] for post_id in post_ids])
+            for author_id, count in Counter(
+                post.author_id for post in posts
+            ).items():
+                counters.change_user(author_id, posts_count=count)
+            for group_id, count in Counter(
+                post.group_id for post in posts
+            ).items():
+                counters.change_group(group_id, count)
+            if settings.TIMELINE_ENABLED:
+                timeline.push_posts.delay(post_ids)
+            bump_generation('posts')
+
+    def run(self, rows, done=0, on_batch=None):
+        """Загружает записи, пропустив первые done.
+
+        После каждой пачки вызывается on_batch(обработано записей).
+        """
+        resumed = done > 0
+        rows = itertools.islice(rows, done, None)
+        for chunk in chunked(rows, self.batch_size):
+            parsed = self.parse(chunk)
+            if resumed and parsed:
+                kept = _not_imported(parsed)
+                self.stats['duplicates'] += len(parsed) - len(kept)
+                parsed = kept
+            resumed = False
+            if parsed:
+                self.store_images(parsed)
+                self.insert([post for post, _ in parsed])
+                self.stats['imported'] += len(parsed)
+            done += len(chunk)
+            if on_batch:
+                on_batch(done)
+        return dict(self.stats)
@@ -0,0 +1,161 @@
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+
+from posts import benchmark
+from posts.models import Post
+
+DEFAULT_DATABASE = os.path.join(tempfile.gettempdir(), 'yatube_bench.sqlite3')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отдельную базу данными реалистичного объёма, гоняет '
+        'смешанную нагрузку по лентам, посту и API и пишет p50/p99, '
+        'запросы к БД и память по представлениям в JSON.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на пользователя (авторы выбираются по Ципфу)',
+        )
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--memory-samples', type=int, default=10)
+        parser.add_argument(
+            '--readers', type=int, default=50,
+            help='Сколько пользователей заходят в ленты под своим именем',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DATABASE,
+            help='Файл базы стенда; рабочая база не затрагивается',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не пересоздавать базу стенда и не заполнять её заново',
+        )
+        parser.add_argument('--output', help='Куда записать JSON результата')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+        rng = random.Random(options['seed'])
+        # Картинки стенда лежат рядом с его базой и живут столько же.
+        media_root = options['database'] + '.media'
+
+        setup_test_environment()
+        connection.settings_dict['TEST']['NAME'] = options['database']
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options['keepdb'],
+        )
+        try:
+            # Реплики смотрят на рабочую базу, а не на базу стенда.
+            with override_settings(
+                REPLICA_DATABASES=[], MEDIA_ROOT=media_root
+            ):
+                result = self.run(options, rng)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+            if not options['keepdb']:
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        report = json.dumps(result, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+        if baseline:
+            self.print_comparison(baseline, result)
+
+    def run(self, options, rng):
+        if not (options['keepdb'] and Post.objects.exists()):
+            self.stderr.write('Заполнение базы стенда...')
+            benchmark.seed(
+                users=options['users'],
+                posts=options['posts'],
+                groups=options['groups'],
+                follows=options['follows'],
+                comments=options['comments'],
+                image_share=options['image_share'],
+                readers=options['readers'],
+                rng=rng,
+            )
+        if not Post.objects.exists():
+            raise CommandError('В базе стенда нет постов')
+        self.stderr.write('Прогон нагрузки...')
+        result = benchmark.replay(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            memory_samples=options['memory_samples'],
+            readers=options['readers'],
+            rng=rng,
+        )
+        return {
+            'meta': {
+                'commit': current_commit(),
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'seed': options['seed'],
+            },
+            'data': benchmark.table_counts(),
+            **result,
+        }
+
+    def print_comparison(self, baseline, result):
+        self.stdout.write(
+            f'Сравнение с {baseline["meta"].get("commit") or "прошлым"}:'
+        )
+        for view, name, old, new, change in benchmark.compare(
+            baseline, result
+        ):
+            line = f'{view:>20} {name:>12}: {old:>10} -> {new:>10} '
+            line += f'({change:+.1f}%)'
+            if change > 10:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
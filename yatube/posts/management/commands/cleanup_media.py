@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, и '
+        'миниатюры в media/cache без оригиналов.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Не трогать картинки моложе стольких часов',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не удаляя',
+        )
+
+    def handle(self, *args, **options):
+        images, previews = thumbnails.cleanup(
+            min_age=timedelta(hours=options['min_age']),
+            dry_run=options['dry_run'],
+        )
+        verb = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} картинок без постов: {images}, '
+            f'миниатюр без оригиналов: {previews}'
+        )
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exports
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии и подписки - все или '
+        'одного пользователя - в JSONL, CSV или zip с картинками.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=exports.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--data', choices=list(exports.DATASETS), default='posts',
+            help='Набор для jsonl и csv; zip содержит все',
+        )
+        parser.add_argument('--user', help='Выгрузить данные одного автора')
+        parser.add_argument(
+            '--output', default='-', help='Файл выгрузки или - для stdout'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        chunks = exports.stream(options['format'], user, options['data'])
+        binary = options['format'] == 'zip'
+        if options['output'] == '-':
+            output = sys.stdout.buffer if binary else self.stdout
+            self.write(output, chunks)
+            return
+        if binary:
+            output = open(options['output'], 'wb')
+        else:
+            output = open(options['output'], 'w', encoding='utf-8', newline='')
+        with output:
+            self.write(output, chunks)
+
+    def write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
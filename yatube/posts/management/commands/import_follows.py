@@ -0,0 +1,43 @@
+import csv
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follows
+from posts.utils import read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Применяет граф подписок из CSV (follower,author,action) или '
+        'JSONL построчно, пачками bulk_create и DELETE.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл графа или - для stdin')
+        parser.add_argument(
+            '--format', choices=follows.FORMATS,
+            help='Формат файла; по умолчанию - по расширению',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in follows.FORMATS:
+            raise CommandError('Укажите --format csv или --format jsonl')
+        if path == '-':
+            stats = self.run(sys.stdin, fmt)
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                stats = self.run(file, fmt)
+        self.stdout.write(', '.join(
+            f'{name}: {count}' for name, count in stats.items()
+        ))
+
+    def run(self, lines, fmt):
+        try:
+            return follows.GraphImport().run(read_rows(lines, fmt))
+        except (ValueError, csv.Error) as error:
+            raise CommandError(f'Не удалось разобрать строку: {error}')
@@ -0,0 +1,123 @@
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts import imports
+from posts.utils import read_rows
+
+FORMATS = ('csv', 'jsonl')
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из выгрузки CSV или JSONL (text, author, group, '
+        'pub_date, image) пачками bulk_create; картинки и миниатюры '
+        'готовит пул процессов. Прерванный импорт продолжается с '
+        'контрольной точки.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или - для stdin')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию - по расширению',
+        )
+        parser.add_argument(
+            '--images',
+            help='Каталог, от которого отсчитываются пути картинок; '
+                 'по умолчанию - каталог файла выгрузки',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=imports.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Процессов для картинок; 0 - в текущем процессе',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию - <файл>.checkpoint',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на контрольную точку',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise CommandError('Укажите --format csv или --format jsonl')
+        checkpoint = options['checkpoint'] or (
+            None if path == '-' else f'{path}.checkpoint'
+        )
+        done = 0
+        if checkpoint and not options['restart']:
+            done = self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжение после {done} записей')
+        images_dir = options['images'] or (
+            os.getcwd() if path == '-' else os.path.dirname(path)
+        )
+
+        def on_batch(rows):
+            if checkpoint:
+                self.write_checkpoint(checkpoint, rows)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Обработано записей: {rows}')
+
+        with self.pool(options['workers']) as pool, self.open(path) as lines:
+            importer = imports.PostImport(
+                images_dir, pool, options['batch_size']
+            )
+            try:
+                stats = importer.run(read_rows(lines, fmt), done, on_batch)
+            except (ValueError, csv.Error) as error:
+                raise CommandError(f'Не удалось разобрать запись: {error}')
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(', '.join(
+            f'{name}: {count}' for name, count in stats.items()
+        ))
+
+    def pool(self, workers):
+        if not workers:
+            return contextlib.nullcontext()
+        # Процессы запускаются заново, а не форком: им не достаются
+        # открытые соединения с базой и кэшем.
+        connections.close_all()
+        return ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+
+    def open(self, path):
+        if path == '-':
+            return contextlib.nullcontext(sys.stdin)
+        return open(path, newline='', encoding='utf-8')
+
+    def read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as file:
+                return json.load(file)['rows']
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError):
+            raise CommandError(f'Испорчена контрольная точка {checkpoint}')
+
+    def write_checkpoint(self, checkpoint, rows):
+        # Запись через временный файл: при сбое остаётся прошлая точка.
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'rows': rows}, file)
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import deletion
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователя или пост со всей историей пачками, без '
+        'загрузки зависимых строк в память, и показывает прогресс.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--user', help='Имя или id пользователя')
+        target.add_argument('--post', type=int, help='id поста')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Поставить удаление в очередь задач',
+        )
+        parser.add_argument(
+            '--status', action='store_true',
+            help='Показать прогресс фонового удаления',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        if options['user']:
+            model, task = User, deletion.delete_user
+            pk = User.objects.filter(
+                username=options['user']
+            ).values_list('pk', flat=True).first()
+            if pk is None and options['user'].isdigit():
+                # Удалённого пользователя можно найти только по id.
+                pk = int(options['user'])
+        else:
+            model, task, pk = Post, deletion.delete_post, options['post']
+        if options['status']:
+            state = deletion.progress(model, pk)
+            if state is None:
+                raise CommandError('Удаление не запускалось')
+            self.show(state)
+            return
+        if pk is None or not model.objects.filter(pk=pk).exists():
+            raise CommandError('Нечего удалять')
+        if options['background']:
+            task.delay(pk)
+            self.stdout.write(
+                f'Удаление поставлено в очередь, прогресс: --status с id {pk}'
+            )
+            return
+        self.show(deletion.purge(model, pk, on_progress=self.progress))
+
+    def progress(self, state):
+        if self.verbosity > 1:
+            self.show(state)
+
+    def show(self, state):
+        total = max(state['total'], state['deleted'], 1)
+        self.stdout.write(
+            f'Удалено {state["deleted"]} из ~{state["total"]} строк '
+            f'({state["deleted"] * 100 // total}%)'
+            + (', готово' if state['done'] else '')
+        )
+        if state['done'] or self.verbosity > 2:
+            for label, count in sorted(state['models'].items()):
+                self.stdout.write(f'  {label}: {count}')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                counters.rebuild()
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
+            return
+        wrong = counters.mismatches()
+        for model, pk, field, stored, actual in wrong:
+            if stored is None:
+                self.stdout.write(f'{model} #{pk}: нет строки счётчиков')
+            else:
+                self.stdout.write(
+                    f'{model} #{pk}: {field} = {stored}, ожидается {actual}'
+                )
+        if wrong:
+            raise CommandError(f'Расхождений в счётчиках: {len(wrong)}')
+        self.stdout.write(self.style.SUCCESS('Счётчики в порядке.'))
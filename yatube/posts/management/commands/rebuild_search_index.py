@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, PostTerm
+from posts.search import index_post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс по текстам всех постов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            PostTerm.objects.all().delete()
+            for post in Post.objects.only('text').iterator(chunk_size=2000):
+                index_post(post)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters, timeline
+from posts.models import Follow, UserStats
+from posts.utils import chunked
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает ленты подписок по таблице подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько лент перестраивается в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True
+        ).distinct()
+        for chunk in chunked(user_ids.iterator(), options['chunk_size']):
+            with transaction.atomic():
+                # Граница ленты хранится в UserStats: недостающие строки
+                # создаются вместе со счётчиками.
+                existing = set(UserStats.objects.filter(
+                    user_id__in=chunk
+                ).values_list('user_id', flat=True))
+                for user_id in set(chunk) - existing:
+                    counters.rebuild_user(user_id)
+                timeline.rebuild(chunk)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок перестроены.'))
@@ -0,0 +1,103 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from posts.models import Group, Post, User
+
+# Страницы, которые рендерятся: шаблон, адрес и флаги переключателя лент.
+PAGES = {
+    'posts/index.html': ('/', {'index': True}),
+    'posts/group_list.html': ('/group/bench/', {}),
+    'posts/profile.html': ('/profile/bench/', {}),
+    'posts/follow.html': ('/follow/', {'follow': True}),
+}
+
+
+def engine(cached):
+    """Бэкенд шаблонов как в settings.TEMPLATES, с кэшем или без."""
+    params = {**settings.TEMPLATES[0], 'NAME': 'bench', 'APP_DIRS': False}
+    del params['BACKEND']
+    loaders = [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]
+    params['OPTIONS'] = {
+        **params['OPTIONS'],
+        'debug': False,
+        'loaders': [('django.template.loaders.cached.Loader', loaders)]
+        if cached else loaders,
+    }
+    return DjangoTemplates(params)
+
+
+def page_context(posts):
+    author = User(pk=1, username='bench', first_name='Автор')
+    group = Group(pk=1, title='Группа', slug='bench')
+    now = datetime.now(timezone.utc)
+    page = Paginator([
+        Post(
+            pk=i, text=f'Текст поста {i} ' * 20, author=author,
+            group=group, pub_date=now,
+        ) for i in range(1, posts + 1)
+    ], posts).page(1)
+    return {
+        'page_obj': page, 'author': author, 'group': group,
+        'posts_count': posts, 'feed_cache_key': '',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет процессорное время рендеринга лент с кэшируемыми '
+        'загрузчиками шаблонов и без них, без базы данных и кэша.'
+    )
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=300)
+        parser.add_argument('--posts', type=int, default=10)
+
+    def handle(self, *args, **options):
+        context = page_context(options['posts'])
+        factory = RequestFactory()
+        dummy = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }}
+        # Фрагменты {% cache %} не должны подменять рендеринг ленты.
+        with override_settings(CACHES=dummy):
+            for cached in (False, True):
+                backend = engine(cached)
+                total = 0
+                for name, (path, extra) in PAGES.items():
+                    request = factory.get(path)
+                    request.user = AnonymousUser()
+                    request.resolver_match = resolve(path)
+                    spent = self.measure(
+                        backend, name, {**context, **extra}, request,
+                        options['renders'],
+                    )
+                    total += spent
+                    self.stdout.write(
+                        f'{"cached" if cached else "uncached":>8} '
+                        f'{name:<24} {spent * 1000:7.3f} мс на рендеринг'
+                    )
+                self.stdout.write(
+                    f'{"cached" if cached else "uncached":>8} '
+                    f'{"в среднем":<24} '
+                    f'{total / len(PAGES) * 1000:7.3f} мс на рендеринг'
+                )
+
+    def measure(self, backend, name, context, request, renders):
+        """Процессорное время одного рендеринга, в секундах."""
+        backend.get_template(name).render(context, request)
+        started = time.process_time()
+        for _ in range(renders):
+            backend.get_template(name).render(context, request)
+        return (time.process_time() - started) / renders
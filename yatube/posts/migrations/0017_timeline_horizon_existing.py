@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def close_timelines(apps, schema_editor):
+    """Подписки, появившиеся раньше лент, в ленты не разложены: их
+    граница ставится на текущий момент, и такие ленты читаются по
+    таблице подписок, пока их не перестроит rebuild_timelines."""
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(
+        user_id__in=Follow.objects.values('user_id'),
+        timeline_horizon__isnull=True,
+    ).update(timeline_horizon=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_timeline_horizon'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_timelines, migrations.RunPython.noop),
+    ]
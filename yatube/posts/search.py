@@ -0,0 +1,118 @@
+"""Полнотекстовый поиск по постам через инвертированный индекс PostTerm.
+
+Текст режется на слова, слова приводятся к основе русским стеммером, и
+для каждой основы хранится число её вхождений в пост. Запрос находит
+посты со всеми основами и ранжирует их по сумме tf * idf.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db.models import Case, Count, F, IntegerField, Sum, When
+from django.utils.dateparse import parse_datetime
+
+from core.tasks import task
+
+from .models import Post, PostTerm
+from .stemmer import stem
+from .utils import CursorPaginator
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH: int = 64
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'вот', 'все', 'вы', 'да', 'для', 'до',
+    'его', 'ее', 'если', 'же', 'за', 'и', 'из', 'или', 'им', 'их', 'к',
+    'как', 'ко', 'ли', 'мне', 'мы', 'на', 'не', 'нет', 'ни', 'но', 'о',
+    'об', 'он', 'она', 'они', 'оно', 'от', 'по', 'при', 'с', 'со', 'так',
+    'то', 'ты', 'у', 'уже', 'что', 'это', 'я',
+))
+
+
+def tokenize(text):
+    """Основы значимых слов текста."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in words if word not in STOP_WORDS
+    ]
+
+
+def _post_terms(post_id, text):
+    return [
+        PostTerm(term=term, post_id=post_id, count=count)
+        for term, count in Counter(tokenize(text)).items()
+    ]
+
+
+def index_post(post):
+    """Перестраивает индекс одного поста после создания или правки."""
+    PostTerm.objects.filter(post_id=post.pk).delete()
+    PostTerm.objects.bulk_create(_post_terms(post.pk, post.text))
+
+
+@task(priority=3, batch=True)
+def reindex_posts(batch):
+    """Перестраивает индекс постов пачки одним DELETE и одним INSERT."""
+    post_ids = {post_id for post_id, in batch}
+    PostTerm.objects.filter(post_id__in=post_ids).delete()
+    PostTerm.objects.bulk_create([
+        term
+        for post_id, text in Post.objects.filter(
+            pk__in=post_ids
+        ).values_list('pk', 'text')
+        for term in _post_terms(post_id, text)
+    ])
+
+
+def _query_terms(query):
+    return sorted(set(tokenize(query)))
+
+
+def matching_ids(query):
+    """Подзапрос pk постов, в которых есть все слова запроса."""
+    terms = _query_terms(query)
+    return PostTerm.objects.filter(term__in=terms).values('post_id').annotate(
+        matched=Count('pk')
+    ).filter(matched=len(terms)).values('post_id')
+
+
+def _weights(terms):
+    """Целый вес idf каждой основы, чтобы ранг сравнивался точно."""
+    frequencies = dict(
+        PostTerm.objects.filter(term__in=terms).values('term').annotate(
+            frequency=Count('pk')
+        ).values_list('term', 'frequency')
+    )
+    # Наибольший pk дёшево оценивает число постов без COUNT(*).
+    total = Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return {
+        term: int(1000 * math.log(1 + (total or 1) / frequency)) + 1
+        for term, frequency in frequencies.items()
+    }
+
+
+def search(query):
+    """Посты со всеми словами запроса, с рангом в поле score."""
+    terms = _query_terms(query)
+    weights = _weights(terms) if terms else {}
+    if not terms or len(weights) < len(terms):
+        return Post.objects.none()
+    return Post.objects.filter(search_terms__term__in=terms).annotate(
+        matched=Count('search_terms'),
+        score=Sum(Case(
+            *[
+                When(
+                    search_terms__term=term,
+                    then=F('search_terms__count') * weight,
+                ) for term, weight in weights.items()
+            ],
+            output_field=IntegerField(),
+        )),
+    ).filter(matched=len(terms)).order_by('-score', '-pub_date', '-pk')
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсор по (ранг, дата, pk): сначала самые релевантные посты."""
+    key_fields = (
+        ('score', int), ('pub_date', parse_datetime), ('pk', int),
+    )
@@ -0,0 +1,112 @@
+"""Стеммер Snowball для русского языка.
+
+Реализация алгоритма http://snowball.tartarus.org/algorithms/russian/
+stemmer.html без внешних зависимостей.
+"""
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = len(word)
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = i + 1
+            break
+
+    def after_syllable(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_syllable(0)
+    return rv, after_syllable(r1)
+
+
+def _strip(word, start, endings, after_a=False):
+    """Отрезает самое длинное окончание из endings внутри области."""
+    for ending in sorted(endings, key=len, reverse=True):
+        stem = word[:-len(ending)]
+        if not word.endswith(ending) or len(stem) < start:
+            continue
+        if after_a and not (len(stem) > start and stem[-1] in 'ая'):
+            continue
+        return stem
+    return None
+
+
+def _strip_groups(word, start, groups):
+    first, second = groups
+    candidates = [
+        stem for stem in (
+            _strip(word, start, first, after_a=True),
+            _strip(word, start, second),
+        ) if stem is not None
+    ]
+    return min(candidates, key=len) if candidates else None
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    # Шаг 1.
+    stemmed = _strip_groups(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stemmed = _strip(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _strip_groups(stemmed, rv, PARTICIPLE) or stemmed
+        else:
+            stemmed = (
+                _strip_groups(word, rv, VERB)
+                or _strip(word, rv, NOUN)
+            )
+    word = stemmed if stemmed is not None else word
+
+    # Шаг 2.
+    word = _strip(word, rv, ('и',)) or word
+
+    # Шаг 3.
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    # Шаг 4.
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн'):
+            word = word[:-1]
+        return word
+    return _strip(word, rv, ('ь',)) or word
@@ -0,0 +1,111 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from posts.utils import POSTS_ON_LIST
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_ON_LIST + 3):
+            cls.post = Post.objects.create(
+                text=f'Тестовый пост {i}', author=cls.user, group=cls.group
+            )
+        Comment.objects.create(
+            text='Комментарий', author=cls.user, post=cls.post
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_feed_pages_with_cursor(self):
+        """Лента отдаётся страницами, курсор ведёт на следующую."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('api:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).json()
+                self.assertEqual(len(first['results']), POSTS_ON_LIST)
+                self.assertEqual(first['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': DjangoJSONEncoder().default(
+                        self.post.pub_date
+                    ),
+                    'author': 'auth',
+                    'group': 'test-slug',
+                    'image': None,
+                    'comments_count': 1,
+                })
+                second = self.guest_client.get(
+                    url, {'cursor': first['next']}
+                ).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только перечисленные поля."""
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,author'}
+        )
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.pk, 'author': 'auth'},
+        )
+        response = self.guest_client.get(
+            reverse('api:index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_feed_does_not_query_related_rows(self):
+        """Страница ленты - один SELECT с JOIN, без COUNT(*)."""
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('api:index'))
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии отдаются отдельными ресурсами."""
+        post = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+            {'fields': 'text'},
+        ).json()
+        self.assertEqual(post, {'text': self.post.text})
+        comments = self.guest_client.get(
+            reverse('api:post_comments', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(
+            [(c['text'], c['author']) for c in comments['results']],
+            [('Комментарий', 'auth')],
+        )
+        response = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_response_is_gzipped(self):
+        """Клиент, принимающий gzip, получает сжатый ответ."""
+        response = self.guest_client.get(
+            reverse('api:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), POSTS_ON_LIST)
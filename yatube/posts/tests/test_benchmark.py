@@ -0,0 +1,89 @@
+import random
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        with self.settings(TIMELINE_SIZE=20):
+            self.counts = benchmark.seed(
+                users=30, posts=300, groups=3, follows=5, comments=40,
+                image_share=0.3, readers=5, rng=random.Random(1),
+            )
+
+    def test_seed_is_skewed(self):
+        self.assertEqual(self.counts['posts'], 300)
+        self.assertGreater(self.counts['image_posts'], 0)
+        self.assertEqual(self.counts['comments'], 40)
+        # Самый популярный автор пишет и собирает подписчиков больше всех.
+        top = min(Post.objects.values_list('author_id', flat=True))
+        self.assertGreater(
+            Post.objects.filter(author_id=top).count(), 300 // 30
+        )
+        self.assertGreater(
+            Follow.objects.filter(author_id=top).count(),
+            self.counts['follows'] // 30,
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_capped_timelines_have_horizon(self):
+        """Подрезанная при заполнении лента получает границу, как после
+        timeline.trim."""
+        capped = 0
+        for stats in UserStats.objects.filter(timeline_horizon__isnull=False):
+            entries = TimelineEntry.objects.filter(user_id=stats.user_id)
+            self.assertEqual(entries.count(), 20)
+            self.assertFalse(entries.filter(
+                pub_date__lte=stats.timeline_horizon
+            ).exists())
+            capped += 1
+        self.assertGreater(capped, 0)
+
+    def test_replay_reports_every_view(self):
+        result = benchmark.replay(
+            requests=200, warmup=5, memory_samples=1, readers=5,
+            rng=random.Random(2),
+        )
+        self.assertEqual(set(result['views']), set(benchmark.WORKLOAD))
+        for view, metrics in result['views'].items():
+            with self.subTest(view=view):
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+                self.assertGreater(metrics['max_queries'], 0)
+                self.assertGreater(metrics['peak_memory_kb'], 0)
+        self.assertEqual(result['total']['requests'], 200)
+
+        slower = {
+            'views': {
+                view: {**metrics, 'p50_ms': metrics['p50_ms'] * 2}
+                for view, metrics in result['views'].items()
+            },
+            'total': result['total'],
+        }
+        changes = {
+            (view, name): change
+            for view, name, _, _, change in benchmark.compare(result, slower)
+        }
+        self.assertAlmostEqual(changes['posts:index', 'p50_ms'], 100)
+        self.assertEqual(changes['total', 'p99_ms'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.99), 7)
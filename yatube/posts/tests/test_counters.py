@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Task
+from core.tasks import run_pending
+from core.tests.utils import commit_hooks
+from posts.models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserStats
+)
+from posts.utils import generation
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Following')
+        cls.user = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа2',
+            slug='test-slug2',
+            description='Тестовое описание2',
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый пост', 'group': self.group.pk},
+        )
+        post = Post.objects.get()
+        self.user_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        self.user_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Following'})
+        )
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.author_client.get(
+            reverse('posts:post_delete', kwargs={'post_id': post.pk})
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 0
+        )
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_group_change_moves_post_count(self):
+        """Смена группы при редактировании переносит счётчик."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Тестовый пост', 'group': self.group2.pk},
+        )
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 1)
+
+    def test_rebuild_counters_command(self):
+        """Команда находит и исправляет расхождения."""
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        Comment.objects.bulk_create([
+            Comment(text='Комментарий', author=self.user, post=post)
+        ])
+        UserStats.objects.filter(user=self.user).delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', '--check')
+        call_command('rebuild_counters')
+        call_command('rebuild_counters', '--check')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_side_effects_are_offloaded_to_worker(self):
+        """Запрос пишет пост и задачи, остальное делает воркер."""
+        Follow.objects.create(user=self.user, author=self.author)
+        run_pending()
+        with CaptureQueriesContext(connection) as queries:
+            self.author_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Тестовый пост', 'group': self.group.pk},
+            )
+        writes = [
+            query['sql'].split('"')[1] for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(writes.count('posts_post'), 1)
+        self.assertIn('core_task', writes)
+        self.assertLessEqual(
+            set(writes), {'posts_post', 'core_task', 'django_session'}
+        )
+        post = Post.objects.get()
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+        run_pending()
+        self.assertFalse(Task.objects.exists())
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post
+        ).exists())
+
+    @override_settings(TASKS_EAGER=False)
+    def test_worker_bumps_generations_after_deltas(self):
+        """Кэш страниц со счётчиками сбрасывается, когда воркер их менял."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        run_pending()
+        names = ['posts', f'comments:{post.pk}', f'follows:{self.user.pk}']
+        self.user_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        before = {name: generation(name) for name in names}
+        with commit_hooks():
+            run_pending()
+        for name in names:
+            self.assertNotEqual(generation(name), before[name], name)
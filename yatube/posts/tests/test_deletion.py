@@ -0,0 +1,159 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters, deletion, thumbnails
+from posts.models import (
+    Comment, Follow, Group, Post, PostTerm, TimelineEntry, UserStats,
+)
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def image(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+class DeletionTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Своё хранилище на тест: файлы не откатываются вместе с базой.
+        media = override_settings(
+            MEDIA_ROOT=tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.heavy = User.objects.create_user(username='heavy')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        Follow.objects.create(user=self.other, author=self.heavy)
+        Follow.objects.create(user=self.heavy, author=self.other)
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.heavy, group=self.group,
+                image=image(f'heavy{i}.gif') if i < 2 else '',
+            ) for i in range(5)
+        ]
+        self.other_post = Post.objects.create(
+            text='Чужой пост', author=self.other, group=self.group
+        )
+        for post in self.posts[:3]:
+            Comment.objects.create(post=post, author=self.other, text='Ответ')
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.other_post, author=self.heavy, text='Ответ'
+            )
+        thumbnails.generate(self.posts[0].image.name)
+
+    def test_delete_user_in_batches(self):
+        """Пользователь удаляется со всей историей, счётчики сходятся."""
+        images = [post.image.name for post in self.posts[:2]]
+        state = deletion.purge(User, self.heavy.pk)
+        self.assertTrue(state['done'])
+        self.assertEqual(state['models']['posts.Post'], 5)
+        self.assertGreaterEqual(state['total'], state['deleted'])
+        self.assertEqual(deletion.progress(User, self.heavy.pk), state)
+
+        self.assertFalse(User.objects.filter(pk=self.heavy.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.other_post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(UserStats.objects.filter(user=self.heavy).exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(PostTerm.objects.exclude(
+            post=self.other_post
+        ).exists())
+        self.assertEqual(counters.mismatches(), [])
+        for name in images:
+            self.assertFalse(default_storage.exists(name))
+        self.assertFalse(list(thumbnails.orphaned_thumbnails()))
+
+    def test_small_batches_match_collector_counts(self):
+        """Пачки меньше числа строк удаляют то же, что и Collector."""
+        planned = deletion.plan(User.objects.filter(pk=self.heavy.pk))
+        self.assertEqual(planned[Post], 5)
+        self.assertEqual(planned[Comment], 6)
+        deleted = deletion.delete(
+            User.objects.filter(pk=self.heavy.pk), batch_size=2
+        )
+        self.assertEqual(deleted[Post], 5)
+        self.assertEqual(deleted[Comment], 6)
+        self.assertEqual(deleted[User], 1)
+        self.assertEqual(counters.mismatches(), [])
+
+    def test_post_delete_view_keeps_shared_image(self):
+        """Картинка, на которую ссылается другой пост, остаётся."""
+        post = self.posts[0]
+        Post.objects.filter(pk=self.other_post.pk).update(image=post.image)
+        client = Client()
+        client.force_login(self.heavy)
+        client.post(reverse('posts:post_delete', args=[post.pk]))
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 5)
+        self.assertEqual(counters.mismatches(), [])
+
+    def test_purge_and_cleanup_commands(self):
+        """Команды удаляют пользователя и подчищают медиа."""
+        orphan = default_storage.save('posts/orphan.gif', image('orphan.gif'))
+        call_command('purge', '--user', 'heavy', stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username='heavy').exists())
+        out = io.StringIO()
+        call_command(
+            'purge', '--user', str(self.heavy.pk), '--status', stdout=out
+        )
+        self.assertIn('готово', out.getvalue())
+
+        os.utime(default_storage.path(orphan), (0, 0))
+        stray = default_storage.save('cache/ab/stray.jpg', image('s.jpg'))
+        self.assertEqual(
+            thumbnails.cleanup(min_age=timedelta(hours=1), dry_run=True),
+            (1, 1),
+        )
+        call_command('cleanup_media', stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(default_storage.exists(stray))
+
+    def test_admin_confirmation_counts_without_collector(self):
+        """Подтверждение удаления в админке показывает счётчики строк."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:auth_user_delete', args=[self.heavy.pk])
+        )
+        self.assertEqual(dict(response.context['model_count'])['Посты'], 5)
+        client.post(
+            reverse('admin:auth_user_delete', args=[self.heavy.pk]),
+            {'post': 'yes'},
+        )
+        self.assertFalse(User.objects.filter(pk=self.heavy.pk).exists())
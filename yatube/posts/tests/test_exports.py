@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='exporter')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой', author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        Post.objects.create(text='Чужой пост', author=cls.other)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Мой')
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_jsonl_and_csv_stream_own_data(self):
+        """Выгрузка одного набора идёт потоком и только свои строки."""
+        response = self.client.get(
+            reverse('posts:export'), {'format': 'jsonl', 'data': 'posts'}
+        )
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['author'], 'exporter')
+        self.assertEqual(rows[0]['image'], self.post.image.name)
+
+        response = self.client.get(
+            reverse('posts:export'), {'format': 'csv', 'data': 'follows'}
+        )
+        self.assertIn('yatube-follows.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        self.assertEqual(rows, [{'follower': 'exporter', 'author': 'other'}])
+
+        response = self.client.get(reverse('posts:export'), {'data': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_zip_includes_media(self):
+        """Архив содержит все наборы и картинки постов."""
+        response = self.client.get(reverse('posts:export'))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertEqual(set(archive.namelist()), {
+            'posts.jsonl', 'comments.jsonl', 'follows.jsonl',
+            f'media/{self.post.image.name}',
+        })
+        self.assertEqual(
+            archive.read(f'media/{self.post.image.name}'), SMALL_GIF
+        )
+        comment = json.loads(archive.read('comments.jsonl'))
+        self.assertEqual(comment['post'], self.post.pk)
+
+    def test_export_data_command(self):
+        """Команда выгружает всю таблицу постов в файл."""
+        path = os.path.join(tempfile.mkdtemp(), 'posts.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_data', '--format', 'csv', '--output', path)
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(
+            [row['text'] for row in rows], ['Пост с картинкой', 'Чужой пост']
+        )
@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters, follows, timeline
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class FollowsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(text=f'Пост {author}', author=author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def following(self):
+        return set(Follow.objects.filter(user=self.user).values_list(
+            'author__username', flat=True
+        ))
+
+    def test_follow_and_unfollow_keep_counters_and_timeline(self):
+        """Пачка подписок обновляет счётчики и ленту, повтор не считается."""
+        pairs = [(self.user.pk, author.pk) for author in self.authors]
+        self.assertEqual(follows.follow(pairs + pairs), 3)
+        self.assertEqual(follows.follow(pairs), 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 3
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 3
+        )
+
+        self.assertEqual(follows.unfollow(pairs[:2]), 2)
+        self.assertEqual(self.following(), {'author2'})
+        self.assertEqual(set(TimelineEntry.objects.filter(
+            user=self.user
+        ).values_list('author_id', flat=True)), {self.authors[2].pk})
+        self.assertEqual(counters.mismatches(), [])
+
+    def test_set_following(self):
+        """Подписки приводятся к списку одной разницей множеств."""
+        follows.follow([(self.user.pk, self.authors[0].pk)])
+        result = follows.set_following(self.user.pk, [
+            self.authors[1].pk, self.authors[2].pk, self.user.pk,
+        ])
+        self.assertEqual(result, (2, 1))
+        self.assertEqual(self.following(), {'author1', 'author2'})
+
+    def test_bulk_follow_json(self):
+        """Эндпоинт принимает списки имён в JSON."""
+        follows.follow([(self.user.pk, self.authors[0].pk)])
+        response = self.client.post(
+            reverse('posts:bulk_follow'),
+            json.dumps({
+                'follow': ['author1', 'nobody'], 'unfollow': ['author0'],
+            }),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json(), {
+            'followed': 1, 'unfollowed': 1, 'unknown': 1, 'invalid': 0,
+        })
+        self.assertEqual(self.following(), {'author1'})
+
+    def test_bulk_follow_streams(self):
+        """CSV и JSONL читаются построчно, ошибки в строках считаются."""
+        response = self.client.post(
+            reverse('posts:bulk_follow'),
+            'author,action\nauthor0,follow\nauthor1,\nauthor2,block\n',
+            content_type='text/csv',
+        )
+        self.assertEqual(response.json()['invalid'], 1)
+        self.assertEqual(self.following(), {'author0', 'author1'})
+        response = self.client.post(
+            reverse('posts:bulk_follow'),
+            '{"author": "author0", "action": "unfollow"}\n\n',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.json()['unfollowed'], 1)
+        response = self.client.post(
+            reverse('posts:bulk_follow'), '{', content_type='application/jsonl'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('posts:bulk_follow'), {})
+        self.assertEqual(response.status_code, 415)
+
+    def test_bulk_follow_rejects_malformed_input(self):
+        """Не строки вместо имён и не объекты в JSONL - ошибка 400."""
+        url = reverse('posts:bulk_follow')
+        for body in (
+            {'follow': [{'x': 1}]}, {'follow': 'author0'}, ['author0'],
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    url, json.dumps(body), content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400)
+        for body in ('[1, 2]\n', '"author0"\n', '{"author": ["a"]}\n'):
+            with self.subTest(body=body):
+                response = self.client.post(
+                    url, body, content_type='application/jsonl'
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.following(), set())
+
+    def test_import_follows_command(self):
+        """Команда применяет граф с подписчиком в каждой строке."""
+        lines = [
+            {'follower': 'reader', 'author': 'author0'},
+            {'follower': 'author0', 'author': 'author1'},
+        ]
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', delete=False
+        ) as file:
+            file.write('\n'.join(json.dumps(line) for line in lines))
+        self.addCleanup(os.remove, file.name)
+        call_command('import_follows', file.name, stdout=io.StringIO())
+        self.assertEqual(self.following(), {'author0'})
+        self.assertTrue(Follow.objects.filter(
+            user=self.authors[0], author=self.authors[1]
+        ).exists())
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_trim_keeps_newest(self):
+        """Подрезка оставляет TIMELINE_SIZE самых свежих записей."""
+        follows.follow([(self.user.pk, author.pk) for author in self.authors])
+        timeline.trim([self.user.pk])
+        newest = Post.objects.order_by('-pub_date', '-pk').values_list(
+            'pk', flat=True
+        )[:2]
+        self.assertEqual(set(TimelineEntry.objects.filter(
+            user=self.user
+        ).values_list('post_id', flat=True)), set(newest))
@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import counters, search
+from posts.models import Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Архив', slug='archive', description='Старые посты'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        with open(os.path.join(self.dir, 'cat.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        self.path = os.path.join(self.dir, 'posts.jsonl')
+        rows = [
+            {'text': 'Первый пост про котов', 'author': 'writer',
+             'group': 'archive', 'pub_date': '2015-03-01T10:00:00',
+             'image': 'cat.gif'},
+            {'text': 'Второй пост', 'author': 'writer',
+             'pub_date': '2015-03-02T10:00:00+03:00'},
+            {'text': 'Чужой пост', 'author': 'nobody',
+             'pub_date': '2015-03-03T10:00:00'},
+            {'text': 'Пост без даты', 'author': 'writer'},
+            {'text': 'Третий пост', 'author': 'writer', 'group': 'archive',
+             'pub_date': '2015-03-04T10:00:00', 'image': 'lost.gif'},
+        ]
+        with open(self.path, 'w') as file:
+            file.write('\n'.join(json.dumps(row) for row in rows))
+
+    def import_posts(self, *args):
+        out = io.StringIO()
+        call_command(
+            'import_posts', self.path, '--workers', '0', '--batch-size', '2',
+            *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_import(self):
+        """Посты загружаются с датами, картинками, индексом и лентами."""
+        output = self.import_posts()
+        self.assertIn('imported: 3', output)
+        self.assertIn('invalid: 1', output)
+        self.assertIn('unknown: 1', output)
+        self.assertIn('missing_images: 1', output)
+        self.assertFalse(os.path.exists(self.path + '.checkpoint'))
+
+        post = Post.objects.get(text='Первый пост про котов')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertTrue(post.image.name.startswith('posts/cat'))
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertTrue(os.path.isdir(os.path.join(TEMP_MEDIA_ROOT, 'cache')))
+
+        self.assertEqual(counters.mismatches(), [])
+        self.assertEqual(list(search.search('коты')), [post])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+
+    def test_broken_rows_are_counted(self):
+        """Невозможная дата и не объект в строке не прерывают импорт."""
+        with open(self.path, 'w') as file:
+            file.write('\n'.join([
+                json.dumps({'text': 'Пост', 'author': 'writer',
+                            'pub_date': '2020-13-01T00:00'}),
+                '[1, 2]',
+                '"writer"',
+                json.dumps({'text': ['Пост'], 'author': 'writer',
+                            'pub_date': '2015-03-01T10:00:00'}),
+                json.dumps({'text': 'Целый пост', 'author': 'writer',
+                            'pub_date': '2015-03-01T10:00:00'}),
+            ]))
+        output = self.import_posts()
+        self.assertIn('imported: 1', output)
+        self.assertIn('invalid: 4', output)
+        self.assertTrue(Post.objects.filter(text='Целый пост').exists())
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается с контрольной точки без дублей."""
+        self.import_posts()
+        # Сбой после коммита последней пачки, но до записи её точки.
+        with open(self.path + '.checkpoint', 'w') as file:
+            json.dump({'rows': 4}, file)
+        output = self.import_posts()
+        self.assertIn('Продолжение после 4 записей', output)
+        self.assertIn('imported: 0', output)
+        self.assertIn('duplicates: 1', output)
+        self.assertEqual(Post.objects.count(), 3)
+
+        self.import_posts('--restart')
+        self.assertEqual(Post.objects.count(), 6)
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import POSTS_ON_LIST
+
+User = get_user_model()
+
+
+class QueryPlanTest(TestCase):
+    """Горячие запросы лент идут по составным индексам без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.user = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(POSTS_ON_LIST + 1):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+        Comment.objects.create(
+            author=cls.user, post=cls.post, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def query_plans(self, url):
+        """Планы SELECT-запросов к таблицам posts, выполненных страницей."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append(' | '.join(row[-1] for row in cursor))
+        return plans
+
+    def assertUsesIndex(self, url, index_name):
+        plans = self.query_plans(url)
+        for plan in plans:
+            self.assertNotIn('USE TEMP B-TREE', plan)
+        self.assertTrue(
+            any(index_name in plan for plan in plans),
+            f'{index_name} не используется: {plans}'
+        )
+
+    def test_index_plan(self):
+        url = reverse('posts:index')
+        self.assertUsesIndex(url, 'post_pub_date_idx')
+        cursor = self.authorized_client.get(url).context[
+            'page_obj'
+        ].next_cursor
+        self.assertUsesIndex(f'{url}?cursor={cursor}', 'post_pub_date_idx')
+
+    def test_group_posts_plan(self):
+        self.assertUsesIndex(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            'post_group_pub_date_idx',
+        )
+
+    def test_profile_plan(self):
+        self.assertUsesIndex(
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            'post_author_pub_date_idx',
+        )
+
+    def test_post_detail_plan(self):
+        self.assertUsesIndex(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            'comment_post_created_idx',
+        )
+
+    def test_follow_index_plan(self):
+        url = reverse('posts:follow_index')
+        self.assertUsesIndex(url, 'timeline_user_pub_date_idx')
+        cursor = self.authorized_client.get(url).context[
+            'page_obj'
+        ].next_cursor
+        self.assertUsesIndex(
+            f'{url}?cursor={cursor}', 'timeline_user_pub_date_idx'
+        )
+
+    def test_follow_index_heavy_author_plan(self):
+        """Посты тяжёлого автора читаются по индексу автора."""
+        with self.settings(TIMELINE_FANOUT_LIMIT=0):
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+            self.assertEqual(
+                len(response.context['page_obj']), POSTS_ON_LIST
+            )
+            self.assertUsesIndex(
+                reverse('posts:follow_index'), 'post_author_pub_date_idx'
+            )
+
+    def test_followers_lookup_plan(self):
+        """Подписчики автора ищутся по покрывающему индексу."""
+        followers = Follow.objects.filter(author=self.author).values('user')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + str(followers.query))
+            plan = ' | '.join(row[-1] for row in cursor)
+        self.assertIn('COVERING INDEX follow_author_user_idx', plan)
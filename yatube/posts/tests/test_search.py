@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, PostTerm
+from posts.search import SearchPaginator, search, tokenize
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.cat_post = Post.objects.create(
+            author=cls.user,
+            text='Кошки спят. Кошка спала на красивом диване.',
+        )
+        cls.dog_post = Post.objects.create(
+            author=cls.user,
+            text='Собака и кошка гуляли в парке.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_tokenize_stems_russian_words(self):
+        """Разные формы слова сводятся к одной основе."""
+        self.assertEqual(tokenize('Кошки кошками кошке'), ['кошк'] * 3)
+        self.assertEqual(tokenize('и в на'), [])
+
+    def test_search_ranks_and_requires_all_words(self):
+        """Чаще встречающееся слово поднимает пост выше."""
+        self.assertEqual(list(search('кошками')), [
+            self.cat_post, self.dog_post
+        ])
+        self.assertEqual(list(search('кошка собаки')), [self.dog_post])
+        self.assertEqual(list(search('слон')), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.dog_post.pk)
+        post.text = 'Слон гулял в парке.'
+        post.save()
+        self.assertEqual(list(search('слоны')), [post])
+        self.assertEqual(list(search('собака')), [])
+        post.delete()
+        self.assertFalse(PostTerm.objects.filter(term='слон').exists())
+
+    def test_search_results_are_keyset_paginated(self):
+        """Выдача листается курсором по рангу без повторов."""
+        for i in range(5):
+            Post.objects.create(author=self.user, text=f'Кошка номер {i}')
+        paginator = SearchPaginator(search('кошка'), 3)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        found = [post.pk for page in (first, second, third) for post in page]
+        self.assertEqual(len(found), 7)
+        self.assertEqual(len(set(found)), 7)
+        self.assertEqual(found[0], self.cat_post.pk)
+        self.assertIsNone(third.next_cursor)
+
+    def test_search_page(self):
+        """Страница /search/ выводит найденные посты."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'диване'}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.cat_post])
+        self.assertContains(response, 'красивом диване')
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+
+from core.templatetags.lazy_thumbnail import backend
+from core.tests.utils import commit_hooks
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.small_gif = small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_render_shows_original_until_thumbnail_is_ready(self):
+        """Лента не создаёт миниатюру сама и до её готовности
+        показывает оригинал."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+        )
+
+        with commit_hooks():
+            thumbnails.generate(self.post.image.name)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.post.image.url)
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    def test_page_thumbnails_are_resolved_in_one_lookup(self):
+        """Миниатюры всей страницы ищутся одним запросом к KV-хранилищу."""
+        for i in range(3):
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост с картинкой {i}',
+                image=SimpleUploadedFile(
+                    name=f'small{i}.gif',
+                    content=self.small_gif,
+                    content_type='image/gif',
+                ),
+            )
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
+    def test_missing_thumbnail_is_remembered_briefly(self):
+        """Промах кэшируется на THUMBNAIL_MISS_TIMEOUT, а не навсегда."""
+        self.guest_client.get(reverse('posts:index'))
+        raw_keys = [
+            add_prefix(backend.thumbnail_file(
+                self.post.image, geometry, **options
+            ).key)
+            for geometry, options in thumbnails.THUMBNAIL_SIZES
+        ]
+        cached = [key for key in raw_keys if cache.get(key) is EMPTY_VALUE]
+        self.assertTrue(cached)
+        later = time.time() + settings.THUMBNAIL_MISS_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(cache.get_many(cached), {})
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Post, TimelineEntry, UserStats
+from posts.timeline import FeedPaginator, following_posts
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Following')
+        cls.user = User.objects.create_user(username='Follower')
+        cls.old_post = Post.objects.create(
+            text='Старый пост автора', author=cls.author
+        )
+
+    def setUp(self):
+        self.authorized_user_client = Client()
+        self.authorized_user_client.force_login(self.user)
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        self.authorized_user_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'Following'})
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.old_post
+        ).exists())
+        self.authorized_user_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': 'Following'})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленту подписчика при создании."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post
+        ).exists())
+        response = self.authorized_user_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_timeline_is_capped(self):
+        """Лента хранит не больше TIMELINE_SIZE свежих постов."""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        kept = TimelineEntry.objects.filter(user=self.user).values_list(
+            'post_id', flat=True
+        )
+        self.assertEqual(set(kept), {posts[1].pk, posts[2].pk})
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_fan_out_on_read(self):
+        """Посты популярного автора не раскладываются, а читаются."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorized_user_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), [post, self.old_post]
+        )
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_cursor_continues_past_capped_timeline(self):
+        """За границей подрезанной ленты листание идёт по подпискам."""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(4)
+        ]
+        expected = [*reversed(posts), self.old_post]
+        paginator = FeedPaginator(
+            following_posts(self.user).for_feed(), 2, user=self.user
+        )
+        pages = [paginator.get_page()]
+        while pages[-1].next_cursor:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([post for page in pages for post in page], expected)
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
+        response = self.authorized_user_client.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(list(response.context['page_obj']), expected)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_fan_out_limit_is_backfilled(self):
+        """Посты, написанные автором с большим числом подписчиков,
+        попадают в ленты, когда подписчиков становится меньше порога."""
+        other = User.objects.create_user(username='Other')
+        follows.follow([
+            (self.user.pk, self.author.pk), (other.pk, self.author.pk)
+        ])
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        follows.unfollow([(other.pk, self.author.pk)])
+        self.assertEqual(set(TimelineEntry.objects.filter(
+            user=self.user
+        ).values_list('post_id', flat=True)), {post.pk, self.old_post.pk})
+
+    def test_follows_older_than_timeline_are_rebuilt(self):
+        """Подписки, появившиеся раньше лент, видны в ленте и без неё,
+        а rebuild_timelines раскладывает их посты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        UserStats.objects.filter(user=self.user).delete()
+        url = reverse('posts:follow_index')
+        for query in ({}, {'page': 1}):
+            response = self.authorized_user_client.get(url, query)
+            self.assertEqual(
+                list(response.context['page_obj']), [self.old_post]
+            )
+        call_command('rebuild_timelines')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.old_post
+        ).exists())
+        self.assertIsNone(
+            UserStats.objects.get(user=self.user).timeline_horizon
+        )
+        response = self.authorized_user_client.get(url)
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
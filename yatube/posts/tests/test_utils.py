@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.core.cache import cache
+
+from posts.models import Post
+from posts.utils import CursorPaginator, POSTS_ON_LIST
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create([Post(
+            text=f'Текст тестового поста № {i}',
+            author=cls.user,
+        ) for i in range(25)])
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_walks_all_posts_in_order(self):
+        """Курсоры обходят ленту без пропусков и повторов."""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_LIST)
+        seen = []
+        cursor = None
+        while True:
+            page = paginator.get_page(cursor)
+            seen.extend(post.pk for post in page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу, что была до неё."""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_LIST)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertIsNone(back.previous_cursor)
+
+    def test_page_costs_single_query_without_count(self):
+        """Страница курсора строится одним запросом без COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_LIST)
+        page = paginator.get_page()
+        with self.assertNumQueries(1):
+            page = paginator.get_page(page.next_cursor)
+            self.assertEqual(len(page), POSTS_ON_LIST)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_LIST)
+        self.assertIsNone(response.context['page_obj'].previous_cursor)
+        self.assertContains(response, '?cursor=')
@@ -1,11 +1,16 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from http import HTTPStatus
 
-from posts.models import Post, Group, Follow
+from core.tests.utils import commit_hooks
+from posts.models import Comment, Post, Group, Follow
+from posts.utils import COMMENTS_ON_PAGE, generation
 
 
 User = get_user_model()
@@ -144,20 +149,59 @@ class TaskPagesTests(TestCase):
                 self.assertIsInstance(form_field, expected)
 
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
+        """Фрагмент index хранится в кэше до изменения постов."""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
 
-        Post.objects.create(text='Тест', author=self.user,)
+        Post.objects.filter(pk=self.post.pk).update(text='Тест без сигналов')
         response_old = self.authorized_client.get(reverse('posts:index'))
-        posts_old = response_old.content
-
-        self.assertEqual(posts_old, posts)
-        cache.clear()
+        self.assertEqual(response_old.content, posts)
 
+        with commit_hooks():
+            Post.objects.create(text='Новый тестовый пост', author=self.user,)
         response_new = self.authorized_client.get(reverse('posts:index'))
-        posts_new = response_new.content
-        self.assertNotEqual(posts_old, posts_new)
+        self.assertNotEqual(response_new.content, posts)
+        self.assertContains(response_new, 'Новый тестовый пост')
+
+    def test_cache_follows_group_and_author_changes(self):
+        """Удаление группы и новое имя автора сбрасывают фрагменты лент,
+        а вход пользователя - нет."""
+        writer = User.objects.create_user(username='writer')
+        group = Group.objects.create(
+            title='Удаляемая группа', slug='gone', description='Описание'
+        )
+        with commit_hooks():
+            Post.objects.create(
+                text='Пост в группе', author=writer, group=group
+            )
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Удаляемая группа'
+        )
+        before = generation('posts')
+        Client().force_login(writer)
+        self.assertEqual(generation('posts'), before)
+        with commit_hooks():
+            group.delete()
+        self.assertNotContains(
+            self.guest_client.get(reverse('posts:index')), 'Удаляемая группа'
+        )
+        writer.first_name, writer.last_name = 'Новое', 'Имя'
+        with commit_hooks():
+            writer.save()
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Новое Имя'
+        )
+
+    def test_cache_is_keyed_by_page(self):
+        """Разные страницы ленты не делят один фрагмент кэша."""
+        for i in range(10):
+            Post.objects.create(text=f'Пост для страниц {i}', author=self.user)
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index') + '?page=2'
+        )
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, 'Тестовая пост')
 
 
 class PaginatorViewsTest(TestCase):
@@ -208,6 +252,15 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']), post_on_page
                 )
 
+    def test_profile_renders_only_current_page(self):
+        """Профиль выводит только текущую страницу и общее число постов."""
+        call_command('rebuild_counters')
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'UserAuthor'})
+        )
+        self.assertEqual(response.context['posts_count'], 13)
+        self.assertContains(response, 'Текст тестового поста №', count=10)
+
 
 class FollowViewTest(TestCase):
     @classmethod
@@ -281,3 +334,201 @@ class FollowViewTest(TestCase):
                          self.post_author)
         self.assertNotEqual(response.context['page_obj'][0],
                             self.post_author_1)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Following')
+        cls.user = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт вместе с числом постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'Following'}),
+            reverse('posts:follow_index'),
+        )
+        Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        small = {url: self.count_queries(url) for url in urls}
+        for i in range(9):
+            Post.objects.create(
+                text=f'Тестовый пост {i}', author=self.author, group=self.group
+            )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_queries_do_not_depend_on_heavy_authors(self):
+        """Посты любого числа тяжёлых авторов читаются одним запросом."""
+        url = reverse('posts:follow_index')
+        Post.objects.create(text='Тестовый пост', author=self.author)
+        one = self.count_queries(url)
+        for i in range(3):
+            author = User.objects.create_user(username=f'Heavy{i}')
+            Follow.objects.create(user=self.user, author=author)
+            Post.objects.create(text=f'Тестовый пост {i}', author=author)
+        self.assertEqual(self.count_queries(url), one)
+
+
+class CommentsViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            commenter = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(
+                text=f'Комментарий {i}', author=commenter, post=self.post
+            )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+            )
+        return len(queries)
+
+    def test_post_detail_queries_do_not_depend_on_comments(self):
+        """Число запросов страницы поста не растёт с числом комментариев."""
+        self.add_comments(1)
+        single = self.count_queries()
+        self.add_comments(COMMENTS_ON_PAGE + 5)
+        self.assertEqual(self.count_queries(), single)
+
+    def test_comments_are_paginated_and_loaded_on_demand(self):
+        """Страница поста показывает первую порцию, остальное - по запросу."""
+        self.add_comments(COMMENTS_ON_PAGE + 5)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertEqual(
+            comments[0].text, f'Комментарий {COMMENTS_ON_PAGE + 4}'
+        )
+        self.assertContains(response, 'Показать ещё')
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': comments.next_cursor},
+        )
+        data = response.json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['html'].count('class="media mb-4"'), 5)
+        self.assertIn('Комментарий 0', data['html'])
+        self.assertNotIn(f'Комментарий {COMMENTS_ON_PAGE}', data['html'])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def revalidate(self, client, url):
+        response = client.get(url)
+        return client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_repeat_visit_is_not_modified(self):
+        """Повторный запрос с валидаторами получает 304 без рендеринга."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(response.templates, [])
+
+    def test_new_post_changes_validators(self):
+        """Новый пост меняет ETag всех страниц с постами."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        with commit_hooks():
+            Post.objects.create(
+                text='Новый пост', author=self.user, group=self.group
+            )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_changes_post_detail_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        with commit_hooks():
+            Comment.objects.create(
+                text='Комментарий', author=self.user, post=self.post
+            )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Комментарий')
+
+    def test_validators_change_after_commit(self):
+        """Поколение сменяется после фиксации транзакции, а не в ней."""
+        before = generation('posts')
+        with commit_hooks():
+            Post.objects.create(text='Новый пост', author=self.user)
+            self.assertEqual(generation('posts'), before)
+        self.assertNotEqual(generation('posts'), before)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag одной страницы."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.authorized_client.get(url)['ETag'],
+        )
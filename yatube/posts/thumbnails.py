@@ -0,0 +1,119 @@
+"""Предгенерация миниатюр постов в очереди задач.
+
+post_create и post_edit ставят картинку в очередь, а шаблоны только
+ищут готовую миниатюру (см. тег cached_thumbnail) и до её появления
+показывают оригинал. Картинки удалённых постов и осиротевшие миниатюры
+убирают remove_images и cleanup (команда cleanup_media).
+"""
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.tasks import task
+
+from .models import Post
+from .utils import bump_generation, chunked
+
+# Сколько имён файлов сверяется с базой одним запросом.
+CHECK_CHUNK_SIZE = 500
+
+# Размеры, которые используют шаблоны лент и страницы поста.
+THUMBNAIL_SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+@task(priority=2)
+def generate(name):
+    """Создаёт все миниатюры картинки, которые понадобятся шаблонам.
+
+    Закэшированные фрагменты и ETag лент ещё ссылаются на оригинал,
+    поэтому поколение постов сменяется.
+    """
+    for geometry, options in THUMBNAIL_SIZES:
+        get_thumbnail(name, geometry, **options)
+    bump_generation('posts')
+
+
+def enqueue(post):
+    """Ставит миниатюры картинки поста в очередь."""
+    if post.image:
+        generate.delay(post.image.name)
+
+
+@task(priority=1)
+def remove_images(names):
+    """Удаляет картинки, на которые больше не ссылается ни один пост.
+
+    Вместе с файлом sorl удаляет его миниатюры из media/cache и записи
+    о них в KV-хранилище.
+    """
+    used = set(Post.objects.filter(image__in=names).values_list(
+        'image', flat=True
+    ))
+    for name in set(names) - used:
+        delete(name)
+
+
+def _walk(path):
+    """Имена всех файлов хранилища под каталогом path."""
+    directories, files = default_storage.listdir(path)
+    for name in files:
+        yield f'{path}{name}'
+    for directory in directories:
+        yield from _walk(f'{path}{directory}/')
+
+
+def orphaned_images(min_age):
+    """Картинки постов, на которые не ссылается ни один пост.
+
+    Файлы моложе min_age пропускаются: форма сохраняет картинку раньше,
+    чем коммитится её пост.
+    """
+    upload_to = Post._meta.get_field('image').upload_to
+    if not default_storage.exists(upload_to):
+        return
+    border = timezone.now() - min_age
+    for names in chunked(_walk(upload_to), CHECK_CHUNK_SIZE):
+        used = set(Post.objects.filter(image__in=names).values_list(
+            'image', flat=True
+        ))
+        for name in names:
+            if name not in used and (
+                default_storage.get_modified_time(name) < border
+            ):
+                yield name
+
+
+def orphaned_thumbnails():
+    """Файлы миниатюр, о которых не знает KV-хранилище sorl."""
+    prefix = thumbnail_settings.THUMBNAIL_PREFIX
+    if not default_storage.exists(prefix):
+        return
+    for name in _walk(prefix):
+        if default.kvstore.get(ImageFile(name, default.storage)) is None:
+            yield name
+
+
+def cleanup(min_age=timedelta(days=1), dry_run=False):
+    """Удаляет картинки без постов и миниатюры без оригиналов.
+
+    Возвращает (картинок, миниатюр).
+    """
+    images = thumbnails = 0
+    for names in chunked(orphaned_images(min_age), CHECK_CHUNK_SIZE):
+        images += len(names)
+        if not dry_run:
+            remove_images(names)
+    if not dry_run:
+        # Записи об исчезнувших оригиналах уходят вместе с миниатюрами.
+        default.kvstore.cleanup()
+    for name in orphaned_thumbnails():
+        thumbnails += 1
+        if not dry_run:
+            default_storage.delete(name)
+    return images, thumbnails
@@ -0,0 +1,292 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается в ограниченные ленты подписчиков, и
+follow_index листает ленту по её индексу (см. FeedPaginator). Посты
+авторов, у которых больше TIMELINE_FANOUT_LIMIT подписчиков, не
+раскладываются, а подмешиваются при чтении (fan-out on read).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from core.tasks import task
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import CursorPaginator, _beyond, chunked
+
+# Сколько записей лент вставляется одним bulk_create.
+FANOUT_CHUNK_SIZE = 5000
+
+
+def is_heavy_author(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def heavy_authors(user):
+    """Авторы из подписок пользователя, которые читаются напрямую."""
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values('author_id')
+
+
+def _raise_horizon(user_ids, pub_date):
+    """Сдвигает границу лент user_ids до pub_date, если она была раньше."""
+    UserStats.objects.filter(user_id__in=user_ids).filter(
+        Q(timeline_horizon__isnull=True) | Q(timeline_horizon__lt=pub_date)
+    ).update(timeline_horizon=pub_date)
+
+
+def trim(user_ids):
+    """Оставляет в каждой ленте не больше TIMELINE_SIZE свежих записей.
+
+    По индексу ленты находится первая лишняя запись, и одним DELETE
+    удаляется она и всё, что старше, - без подзапроса на каждую строку.
+    Дата этой записи становится границей ленты.
+    """
+    for user_id in set(user_ids):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        cutoff = list(entries.order_by('-pub_date', '-post_id').values_list(
+            'pub_date', 'post_id'
+        )[settings.TIMELINE_SIZE:settings.TIMELINE_SIZE + 1])
+        if cutoff:
+            pub_date, post_id = cutoff[0]
+            _raise_horizon([user_id], pub_date)
+            entries.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, post_id__lte=post_id)
+            ).delete()
+
+
+@task(priority=5)
+def push_post(post_id):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    push_posts([post_id])
+
+
+@task(priority=5)
+def push_posts(post_ids):
+    """Раскладывает пачку постов в ленты подписчиков их авторов.
+
+    Подписчики всех авторов пачки выбираются одним запросом, записи
+    вставляются пачками, а каждая затронутая лента подрезается один раз.
+    """
+    posts = Post.objects.filter(pk__in=post_ids).exclude(
+        author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('pk', 'author_id', 'pub_date')
+    by_author = defaultdict(list)
+    for post_id, author_id, pub_date in posts:
+        by_author[author_id].append((post_id, pub_date))
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=by_author
+    ).values_list('user_id', 'author_id'):
+        followers[author_id].append(user_id)
+    entries = (
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date,
+        )
+        for author_id, user_ids in followers.items()
+        for post_id, pub_date in by_author[author_id]
+        for user_id in user_ids
+    )
+    for chunk in chunked(entries, FANOUT_CHUNK_SIZE):
+        TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+    trim({user_id for user_ids in followers.values() for user_id in user_ids})
+
+
+@task(priority=5)
+def sync_follow(user_id, author_id):
+    """Приводит ленту к текущему состоянию подписки.
+
+    Задача сверяется с таблицей подписок, а не с событием, поэтому
+    подписки и отписки, выполненные воркерами в любом порядке, сходятся
+    к верной ленте.
+    """
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+    else:
+        prune(user_id, author_id)
+
+
+def _latest_posts(author_id):
+    """Последние TIMELINE_SIZE постов автора и дата следующего за ними."""
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_SIZE + 1])
+    horizon = (
+        posts.pop()[1] if len(posts) > settings.TIMELINE_SIZE else None
+    )
+    return posts, horizon
+
+
+def _fill(user_ids, author_id, posts, horizon):
+    if horizon:
+        _raise_horizon(user_ids, horizon)
+    entries = (
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in user_ids
+        for post_id, pub_date in posts
+    )
+    for chunk in chunked(entries, FANOUT_CHUNK_SIZE):
+        TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def fill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора без подрезки.
+
+    Более старые посты автора в ленту не попадают, и граница ленты
+    сдвигается до них.
+    """
+    if is_heavy_author(author_id):
+        return
+    _fill([user_id], author_id, *_latest_posts(author_id))
+
+
+@task(priority=5)
+def backfill_followers(author_id):
+    """Раскладывает посты автора, переставшего быть тяжёлым, в ленты
+    подписчиков: пока подписчиков было больше TIMELINE_FANOUT_LIMIT,
+    его посты туда не попадали."""
+    if is_heavy_author(author_id):
+        return
+    posts, horizon = _latest_posts(author_id)
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    size = max(1, FANOUT_CHUNK_SIZE // settings.TIMELINE_SIZE)
+    for user_ids in chunked(followers.iterator(), size):
+        _fill(user_ids, author_id, posts, horizon)
+        trim(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    fill(user_id, author_id)
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@task(priority=5)
+def sync_follows(pairs):
+    """sync_follow для пачки пар (подписчик, автор) из posts.follows.
+
+    Каждая лента подрезается один раз за пачку, а не после каждого
+    автора.
+    """
+    authors = defaultdict(set)
+    for user_id, author_id in pairs:
+        authors[user_id].add(author_id)
+    for user_id, author_ids in authors.items():
+        followed = set(Follow.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+        TimelineEntry.objects.filter(
+            user_id=user_id, author_id__in=author_ids - followed
+        ).delete()
+        for author_id in followed:
+            fill(user_id, author_id)
+    trim(authors)
+
+
+def rebuild(user_ids):
+    """Строит ленты user_ids заново по таблице подписок.
+
+    Нужна для подписок, появившихся раньше самих лент: их записи никто
+    не раскладывал.
+    """
+    TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        timeline_horizon=None
+    )
+    for user_id, author_id in Follow.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', 'author_id'):
+        fill(user_id, author_id)
+    trim(user_ids)
+
+
+def following_posts(user):
+    """Посты авторов из подписок пользователя - прямо по таблице подписок."""
+    return Post.objects.annotate(followed=Exists(Follow.objects.filter(
+        user=user, author=OuterRef('author_id')
+    ))).filter(followed=True)
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсор по ленте подписок пользователя user.
+
+    Ключи страницы (дата, id поста) читаются из его ленты по индексу
+    (user, -pub_date) и одним запросом из постов тяжёлых авторов по
+    индексу автора, каждый раз с LIMIT страницы; сами посты затем
+    выбираются из object_list по pk__in. Стоимость страницы не зависит
+    ни от размера таблицы постов, ни от того, насколько лента разрежена.
+
+    Лента ограничена TIMELINE_SIZE: страницы не новее её границы
+    (UserStats.timeline_horizon) дополняются постами object_list, то есть
+    запросом по таблице подписок. Без строки UserStats граница не
+    записывается, и такая лента целиком читается по таблице подписок.
+    """
+
+    def __init__(self, object_list, per_page, user, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+
+    def _keys(self, queryset, fields, values, descending):
+        if values is not None:
+            queryset = queryset.filter(
+                _beyond(fields, values, 'lt' if descending else 'gt')
+            )
+        ordering = [f'-{field}' if descending else field for field in fields]
+        return list(queryset.order_by(*ordering).values_list(
+            *fields
+        )[:self.per_page + 1])
+
+    def _beyond_horizon(self, keys, values, descending, horizon):
+        """Доходит ли страница до границы, за которой лента неполна."""
+        if descending:
+            return len(keys) <= self.per_page or keys[-1][0] <= horizon
+        return values[0] <= horizon
+
+    def _rows(self, values, descending):
+        stats = UserStats.objects.filter(user=self.user).values_list(
+            'timeline_horizon'
+        ).first()
+        if not settings.TIMELINE_ENABLED or stats is None:
+            return super()._rows(values, descending)
+        horizon, = stats
+        keys = self._keys(
+            TimelineEntry.objects.filter(user=self.user),
+            ['pub_date', 'post_id'], values, descending,
+        )
+        authors = list(heavy_authors(self.user).values_list(
+            'author_id', flat=True
+        ))
+        if authors:
+            keys += self._keys(
+                Post.objects.filter(author_id__in=authors),
+                ['pub_date', 'pk'], values, descending,
+            )
+        keys = sorted(set(keys), reverse=descending)[:self.per_page + 1]
+        if horizon and self._beyond_horizon(keys, values, descending, horizon):
+            keys += self._keys(
+                self.object_list.filter(pub_date__lte=horizon),
+                ['pub_date', 'pk'], values, descending,
+            )
+            keys = sorted(set(keys), reverse=descending)[:self.per_page + 1]
+        posts = self.object_list.in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
@@ -1,10 +1,269 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import csv
+import hashlib
+import itertools
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition
+
+from core.db.router import current_replica
 
 POSTS_ON_LIST: int = 10
+COMMENTS_ON_PAGE: int = 20
 
 
-def paginator_view(request, queryset):
-    paginator = Paginator(queryset, POSTS_ON_LIST)
+def generation(name):
+    """Текущее поколение кэша; новое поколение отменяет старые фрагменты."""
+    key = f'generation:{name}'
+    value = cache.get(key)
+    if value is None:
+        # Начальное значение от времени не совпадёт с поколением,
+        # которое было в кэше до его очистки.
+        value = time.time_ns()
+        cache.add(key, value, None)
+        value = cache.get(key, value)
+    return value
+
+
+def bump_generation(name):
+    """Начинает новое поколение; его значение - время изменения в нс.
+
+    Внутри транзакции поколение сменяется только после её фиксации:
+    иначе читатель успел бы закэшировать под новым поколением данные,
+    которых изменение ещё не коснулось.
+    """
+    transaction.on_commit(
+        lambda: cache.set(f'generation:{name}', time.time_ns(), None)
+    )
+
+
+def chunked(iterable, size):
+    """Списки по size элементов из любого, даже потокового, источника."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_rows(lines, fmt):
+    """Записи из CSV с заголовком или JSONL - словари по полям."""
+    if fmt == 'csv':
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+class LookupCache:
+    """Ограниченный LRU-кэш значение поля -> pk для потоковых импортов.
+
+    Новые значения пачки ищутся одним запросом; отсутствующие в базе
+    запоминаются как None.
+    """
+
+    def __init__(self, model, field, size=100000):
+        self.model = model
+        self.field = field
+        self.size = size
+        self.ids = OrderedDict()
+
+    def resolve(self, values):
+        values = set(values) - {None, ''}
+        missing = {value for value in values if value not in self.ids}
+        if missing:
+            found = dict(self.model.objects.filter(**{
+                f'{self.field}__in': missing
+            }).values_list(self.field, 'pk'))
+            for value in missing:
+                self.ids[value] = found.get(value)
+        for value in values:
+            self.ids.move_to_end(value)
+        while len(self.ids) > self.size:
+            self.ids.popitem(last=False)
+        return {value: self.ids[value] for value in values}
+
+
+@contextmanager
+def explicit_dates(model, name):
+    """Даёт bulk_create записать свои даты в поле с auto_now_add."""
+    field = model._meta.get_field(name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _with_replica(names):
+    """При чтении с реплики страница зависит и от её синхронизации."""
+    replica = current_replica()
+    return [*names, f'replica:{replica}'] if replica else list(names)
+
+
+def feed_cache_key(request, *names):
+    """Ключ фрагмента ленты: поколения данных и текущая страница/курсор."""
+    parts = [str(generation(name)) for name in _with_replica(names)]
+    parts.append(request.GET.get('cursor') or request.GET.get('page') or '')
+    return ':'.join(parts)
+
+
+def _page_generations(request, names, kwargs):
+    """Поколения, от которых зависит страница, один раз на запрос."""
+    if not hasattr(request, '_page_generations'):
+        request._page_generations = [
+            generation(name.format(user=request.user.pk, **kwargs))
+            for name in _with_replica(names)
+        ]
+    return request._page_generations
+
+
+def conditional_page(*names):
+    """ETag и Last-Modified страницы по поколениям её данных.
+
+    Имена поколений могут ссылаться на аргументы представления и на
+    {user} - текущего пользователя. Валидаторы считаются до рендеринга
+    из кэша, без запросов к БД, и повторный визит получает 304. В ETag
+    входят пользователь, его сессия и строка запроса: от них зависят
+    шапка, кнопки и CSRF-токен формы.
+    """
+    def etag(request, **kwargs):
+        parts = [str(value) for value in _page_generations(
+            request, names, kwargs
+        )]
+        parts.append(f'{request.user.pk}:{request.session.session_key}')
+        parts.append(request.GET.urlencode())
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        changed = max(_page_generations(request, names, kwargs))
+        return datetime.fromtimestamp(changed / 10 ** 9, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _dump_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def encode_cursor(direction, values):
+    """Кодирует направление и значения ключа в непрозрачную строку."""
+    raw = '|'.join([direction, *map(_dump_value, values)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parsers):
+    """Разбирает курсор; для битого курсора возвращает None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, *values = raw.split('|')
+        if len(values) != len(parsers):
+            return None
+        values = [parse(value) for parse, value in zip(parsers, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in ('next', 'prev') or None in values:
+        return None
+    return direction, values
+
+
+def _beyond(fields, values, lookup):
+    """Строки строго после ключа в лексикографическом порядке полей."""
+    condition = Q()
+    for i, field in enumerate(fields):
+        condition |= Q(
+            **dict(zip(fields[:i], values[:i])),
+            **{f'{field}__{lookup}': values[i]},
+        )
+    return condition
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, pk) без COUNT(*) и OFFSET.
+
+    Страница строится запросом «строки после ключа» с LIMIT per_page + 1,
+    поэтому её стоимость не зависит от глубины листания.
+    """
+    keyset = True
+    # Поля ключа по убыванию, как в Post.Meta.ordering (pk разрешает
+    # равные даты), и разбор их значений из курсора.
+    key_fields = (('pub_date', parse_datetime), ('pk', int))
+
+    def _fetch(self, queryset, descending):
+        fields = [field for field, _ in self.key_fields]
+        ordering = [f'-{field}' if descending else field for field in fields]
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def _rows(self, values, descending):
+        """До per_page + 1 строк за ключом values (None - с начала)."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(_beyond(
+                [field for field, _ in self.key_fields], values,
+                'lt' if descending else 'gt',
+            ))
+        return self._fetch(queryset, descending)
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field, _ in self.key_fields]
+
+    def get_page(self, cursor=None):
+        parsers = [parse for _, parse in self.key_fields]
+        decoded = decode_cursor(cursor, parsers) if cursor else None
+        if decoded is None:
+            rows = self._rows(None, descending=True)
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif decoded[0] == 'next':
+            rows = self._rows(decoded[1], descending=True)
+            has_next, has_previous = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            rows = self._rows(decoded[1], descending=False)
+            has_next, has_previous = True, len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+        page = Page(rows, None, self)
+        page.next_cursor = (
+            encode_cursor('next', self._key(rows[-1]))
+            if rows and has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor('prev', self._key(rows[0]))
+            if rows and has_previous else None
+        )
+        return page
+
+
+class CommentPaginator(CursorPaginator):
+    """Курсор по (created, pk) для ветки комментариев поста."""
+    key_fields = (('created', parse_datetime), ('pk', int))
+
+
+def paginator_view(request, queryset, paginator_class=CursorPaginator,
+                   **options):
+    """Возвращает страницу ленты.
+
+    По умолчанию лента листается курсором (?cursor=...) через
+    paginator_class(queryset, POSTS_ON_LIST, **options), старые ссылки
+    вида ?page=N обслуживаются обычным Paginator.
+    """
     page_number = request.GET.get('page')
+    if page_number is None:
+        paginator = paginator_class(queryset, POSTS_ON_LIST, **options)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = Paginator(queryset, POSTS_ON_LIST)
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,63 +1,129 @@
+import csv
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
-from .models import Post, Group, User, Follow
-from .forms import PostForm, CommentForm
-from .utils import paginator_view
+from core.db.router import replica_reads
 
-POSTS_ON_LIST: int = 10
+from .models import Comment, Post, Group, User, Follow
+from .forms import PostForm, CommentForm
+from . import deletion, exports, follows, thumbnails
+from .counters import user_stats
+from .search import SearchPaginator, search
+from .timeline import FeedPaginator, following_posts
+from .utils import (
+    COMMENTS_ON_PAGE, POSTS_ON_LIST, CommentPaginator, conditional_page,
+    feed_cache_key, paginator_view, read_rows
+)
 
 
+@replica_reads
+@conditional_page('posts')
 def index(request):
-    posts = Post.objects.all().select_related()
+    posts = Post.objects.for_feed()
     page_obj = paginator_view(request, posts)
     index = request
-    context = {'page_obj': page_obj, 'index': index}
+    context = {
+        'page_obj': page_obj,
+        'index': index,
+        'feed_cache_key': feed_cache_key(request, 'posts'),
+    }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page('posts')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = paginator_view(request, posts)
     context = {
         'group': group,
         'posts': posts,
         'page_obj': page_obj,
+        'feed_cache_key': feed_cache_key(request, 'posts'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@conditional_page('posts', 'follows:{user}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    # Автор, его счётчики и подписка читателя - одним запросом.
+    author = get_object_or_404(
+        User.objects.select_related('stats').annotate(
+            is_followed=Exists(Follow.objects.filter(
+                user_id=request.user.pk, author=OuterRef('pk')
+            ))
+        ),
+        username=username,
+    )
+    posts = author.posts.for_feed()
     page_obj = paginator_view(request, posts)
-    user = request.user
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=user, author=author
-    ).exists()
     context = {
         'author': author,
-        'posts': posts,
+        'posts_count': user_stats(author).posts_count,
         'page_obj': page_obj,
-        'following': following,
+        'following': author.is_followed,
+        'feed_cache_key': feed_cache_key(request, 'posts'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(search(query).for_feed(), POSTS_ON_LIST)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    context = {'page_obj': page_obj, 'query': query}
+    return render(request, 'posts/search.html', context)
+
+
+@replica_reads
+@conditional_page('posts', 'comments:{post_id}')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments = comments_page(request, post.pk)
     context = {
         'post': post,
+        'posts_count': user_stats(post.author).posts_count,
         'form': CommentForm(),
         'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(request, post_id):
+    """Страница комментариев поста: авторы одним JOIN, без COUNT(*)."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'author__username')
+    paginator = CommentPaginator(comments, COMMENTS_ON_PAGE)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(request, post.pk)
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comments.html', {'comments': comments}, request
+        ),
+        'next_cursor': comments.next_cursor,
+    })
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     if request.method == 'POST':
         form = PostForm(request.POST or None, files=request.FILES or None,)
@@ -66,6 +132,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.enqueue(post)
             return redirect('posts:profile', request.user.username)
         context = {'form': form, 'is_edit': False, }
         return render(request, 'posts/create_post.html', context)
@@ -75,6 +142,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
@@ -86,6 +154,7 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        thumbnails.enqueue(post)
         return redirect("posts:post_detail", post_id=post_id)
     else:
         context = {'form': form, 'is_edit': True, 'post': post}
@@ -97,11 +166,12 @@ def post_delete(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect("posts:post_detail", post_id=post_id)
-    post.delete()
+    deletion.delete(Post.objects.filter(pk=post.pk))
     return redirect('posts:profile', request.user.username)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Функция обработки формы добавления комментария"""
     post = get_object_or_404(Post, pk=post_id)
@@ -115,14 +185,20 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_view(request, post_list)
+    post_list = following_posts(request.user).for_feed()
+    page_obj = paginator_view(
+        request, post_list, FeedPaginator, user=request.user
+    )
     follow = request
     context = {
         'post_list': post_list,
         'page_obj': page_obj,
         'follow': follow,
+        'feed_cache_key': feed_cache_key(
+            request, 'posts', f'follows:{request.user.pk}'
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -130,21 +206,79 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    already_followed_user = Follow.objects.filter(user=request.user,
-                                                  author=author).exists()
-    if user == author:
-        return redirect('posts:profile', username=username)
-    if already_followed_user:
-        return redirect('posts:profile', username=username)
-    Follow.objects.create(user=request.user, author=author)
+    follows.follow([(request.user.pk, author.pk)])
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow_qs = Follow.objects.filter(author=author, user=request.user)
-    if follow_qs.exists():
-        follow_qs.delete()
+    follows.unfollow([(request.user.pk, author.pk)])
     return redirect('posts:profile', username=username)
+
+
+# Content-Type тела -> формат построчного графа подписок.
+GRAPH_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/jsonl': 'jsonl',
+    'application/x-ndjson': 'jsonl',
+}
+
+
+@login_required
+@require_POST
+def bulk_follow(request):
+    """Подписки и отписки текущего пользователя пачкой.
+
+    JSON {"follow": [имена], "unfollow": [имена]} или построчный CSV
+    (заголовок author,action) / JSONL с полями author и action. Тело
+    CSV и JSONL читается потоком, без загрузки в память.
+    """
+    fmt = GRAPH_CONTENT_TYPES.get(request.content_type)
+    if fmt:
+        rows = read_rows(
+            (line.decode() for line in request), fmt
+        )
+    elif request.content_type == 'application/json':
+        try:
+            rows = follows.json_rows(json.loads(request.body))
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+    else:
+        return JsonResponse(
+            {'error': 'Ожидается JSON, CSV или JSONL'}, status=415
+        )
+    try:
+        stats = follows.GraphImport(follower=request.user).run(rows)
+    except (ValueError, csv.Error) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(stats)
+
+
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'zip': 'application/zip',
+}
+
+
+@login_required
+def export_data(request):
+    """Потоковая выгрузка своих данных.
+
+    ?format=zip (по умолчанию) - все наборы и картинки постов;
+    ?format=jsonl|csv&data=posts|comments|follows - один набор.
+    """
+    fmt = request.GET.get('format', 'zip')
+    name = request.GET.get('data', 'posts')
+    if fmt not in exports.FORMATS or name not in exports.DATASETS:
+        raise Http404
+    response = StreamingHttpResponse(
+        exports.stream(fmt, user=request.user, name=name),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    filename = request.user.username if fmt == 'zip' else name
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{filename}.{fmt}"'
+    )
+    return response
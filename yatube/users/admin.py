@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.admin import BatchDeleteMixin
+from posts.deletion import delete_user
+
+User = get_user_model()
+
+
+class BatchDeleteUserAdmin(BatchDeleteMixin, UserAdmin):
+    """Пользователи с большой историей удаляются фоновой задачей."""
+
+    def delete_model(self, request, obj):
+        delete_user.delay(obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        for user_id in queryset.values_list('pk', flat=True):
+            delete_user.delay(user_id)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BatchDeleteUserAdmin)
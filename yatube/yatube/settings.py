@@ -48,34 +48,52 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db.router.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Панель отладки нужна только при разработке: на каждый запрос она
+# собирает SQL и шаблоны, а на проде это лишняя работа.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
+# Без DEBUG шаблоны разбираются один раз на процесс и дальше берутся
+# скомпилированными из памяти; при разработке - читаются с диска заново.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.nav.nav',
             ],
         },
     },
@@ -84,18 +102,64 @@ TEMPLATES = [
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite в режиме WAL: читатели не ждут писателей, а писатели - друг
+# друга дольше timeout. Соединения живут CONN_MAX_AGE секунд в потоке.
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+SQLITE_OPTIONS = {
+    'timeout': 20,
+    'TRANSACTION_MODE': 'IMMEDIATE',
+    'BUSY_RETRIES': 5,
+    'BUSY_BACKOFF': 0.05,
+    'PRAGMAS': {'journal_mode': 'WAL', **SQLITE_PRAGMAS},
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# Необязательные реплики только для чтения: копии основной базы, которые
+# обновляет manage.py syncreplicas (или litestream, rsync). Пути через
+# запятую в DB_REPLICA; ленты читаются со случайной из них. Режим WAL у
+# копии уже записан в файле, поэтому его не переключаем.
+REPLICA_DATABASES = []
+for number, path in enumerate(filter(None, os.getenv(
+    'DB_REPLICA', ''
+).split(',')), start=1):
+    REPLICA_DATABASES.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'OPTIONS': {
+            **SQLITE_OPTIONS,
+            'PRAGMAS': {**SQLITE_PRAGMAS, 'query_only': 'ON'},
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+# Как часто обновляются реплики (manage.py syncreplicas --interval), и
+# сколько секунд после записи читатель видит основную базу, а не реплику.
+# Закрепление выводится из интервала с запасом на саму синхронизацию;
+# check_replica_settings не даёт сделать его короче интервала.
+REPLICA_SYNC_INTERVAL = 5
+REPLICA_PIN_SECONDS = 2 * REPLICA_SYNC_INTERVAL
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -134,12 +198,16 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+# collectstatic собирает файлы отдельно от исходников в STATICFILES_DIRS.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь задач, воркер отправляет их через
+# TASKS_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 PASSWORD_RESET_CONFIRM_REDIRECT_URL = 'users:password_reset_complete'
@@ -150,12 +218,75 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Общий для воркеров кэш: `python manage.py runcacheserver` и путь к его
+# сокету в CACHE_SOCKET. Через него же работают фрагменты шаблонов,
+# KV-хранилище sorl.thumbnail и сессии. Без сокета — LocMemCache процесса.
+# Сервер распаковывает pickle клиентов, поэтому сокет получает права 0600
+# и принимает только процессы своего пользователя: сайт, воркеры и сервер
+# кэша должны работать под одним пользователем. Если сервер недоступен,
+# кэш работает как пустой, а ошибка пишется в лог.
+CACHE_SOCKET = os.getenv('CACHE_SOCKET', '')
+
+if CACHE_SOCKET:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.backend.SocketCache',
+            'LOCATION': CACHE_SOCKET,
+            'OPTIONS': {'POOL_SIZE': 8},
+        }
+    }
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 INTERNAL_IPS = [
     '127.0.0.1',
-] 
\ No newline at end of file
+]
+
+# Сколько секунд шаблоны помнят, что миниатюры ещё нет. Её создаёт
+# воркер, а с LocMemCache его запись в кэш не видна процессам сайта,
+# поэтому промах не кэшируется на THUMBNAIL_CACHE_TIMEOUT (10 лет).
+THUMBNAIL_MISS_TIMEOUT = 60
+
+# Материализованная лента подписок: размер ленты и порог подписчиков,
+# после которого посты автора подмешиваются при чтении.
+TIMELINE_ENABLED = True
+TIMELINE_SIZE = 1000
+TIMELINE_FANOUT_LIMIT = 5000
+
+# Очередь фоновых задач (core.tasks). Без воркера задачи выполняются
+# сразу при постановке; на проде TASKS_EAGER=0 и manage.py runworker.
+TASKS_EAGER = os.getenv('TASKS_EAGER', '1') == '1'
+TASKS_BATCH_SIZE = 100
+TASKS_RETRY_DELAY = 10
+TASKS_LOCK_TIMEOUT = 600
+
+# Потоки, в которых ASGI-адаптер выполняет представления; чтение запросов
+# и отправку ответов медленным клиентам ведёт цикл событий.
+ASGI_WORKERS = 8
+
+# Бюджеты представлений для core.metrics: запросы к БД и время в мс
+# (queries, db_ms, render_ms, total_ms). Превышение пишется в лог, а
+# с METRICS_BUDGETS_STRICT поднимает ошибку: так тесты ловят лишние
+# запросы (METRICS_BUDGETS_STRICT=1 pytest - для всего набора).
+METRICS_BUDGETS = {
+    'posts:index': {'queries': 6, 'total_ms': 1000},
+    'posts:group_list': {'queries': 6, 'total_ms': 1000},
+    'posts:profile': {'queries': 6, 'total_ms': 1000},
+    'posts:post_detail': {'queries': 7, 'total_ms': 1000},
+    'posts:follow_index': {'queries': 7, 'total_ms': 1000},
+    'api:index': {'queries': 4, 'total_ms': 500},
+    'api:group_posts': {'queries': 5, 'total_ms': 500},
+    'api:profile': {'queries': 5, 'total_ms': 500},
+    'api:post_detail': {'queries': 4, 'total_ms': 500},
+    'api:post_comments': {'queries': 5, 'total_ms': 500},
+}
+METRICS_BUDGETS_STRICT = os.getenv('METRICS_BUDGETS_STRICT', '0') == '1'
+
+# Токен, с которым Prometheus читает /metrics/ (Authorization: Bearer
+# <токен>); без него страница доступна только персоналу.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')